@@ -4,11 +4,13 @@ import asyncio
 import datetime
 import functools
 import json
+import logging
 import os
+import time
 import urllib.parse
 from abc import ABC
-from collections import defaultdict
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
 
 import aiohttp
 import flanautils
@@ -16,9 +18,12 @@ import websockets
 from multibot import MultiBot, constants as multibot_constants
 
 from flanabot import constants
+from flanabot.btc_offers_filter import BtcOffersFilter
+from flanabot.keyword_index import KeywordIndex
 from flanabot.models import Chat, Message
+from models.btc_offers_query import BtcOffersQuery
 from models.dated_offers import DatedOffers
-from models.enums import Exchange, PaymentMethod
+from models.enums import BtcOffersMode, Exchange
 
 
 # ---------------------------------------------------- #
@@ -32,72 +37,44 @@ def preprocess_btc_offers(
         if not message.is_command and message.chat.is_group and not self.is_bot_mentioned(message):
             return
 
-        eur_mode = (
-            '€' in message.text
-            or
-            bool(
-                flanautils.cartesian_product_string_matching(
-                    message.text,
-                    constants.KEYWORDS['eur'],
-                    multibot_constants.PARSER_MIN_SCORE_DEFAULT
-                )
-            )
-        )
-        usd_mode = (
-            '$' in message.text
-            or
-            bool(
-                flanautils.cartesian_product_string_matching(
-                    message.text,
-                    constants.KEYWORDS['usd'],
-                    multibot_constants.PARSER_MIN_SCORE_DEFAULT
-                )
-            )
-        )
-        premium_mode = (
-            '%' in message.text
-            or
-            bool(
-                flanautils.cartesian_product_string_matching(
-                    message.text,
-                    constants.KEYWORDS['premium'],
-                    multibot_constants.PARSER_MIN_SCORE_DEFAULT
-                )
-            )
-        )
+        btc_offers_query = self._parse_btc_offers_query(message.text)
 
-        if len([arg for arg in (eur_mode, usd_mode, premium_mode) if arg]) > 1:
+        if len(btc_offers_query.modes) > 1:
             await self.send_error(
                 'Indica únicamente uno de los siguientes: precio en euros, precio en dólares o prima.',
                 message
             )
             return
 
-        parsed_number = flanautils.text_to_number(message.text, accept_comma=True)
-
-        if not premium_mode and parsed_number < 0 or not flanautils.validate_mongodb_number(parsed_number):
+        if (
+            btc_offers_query.mode is not BtcOffersMode.PREMIUM
+            and
+            btc_offers_query.number < 0
+            or
+            not flanautils.validate_mongodb_number(btc_offers_query.number)
+        ):
             await self.send_error('❌ Por favor, introduce un número válido.', message)
             return
 
         query = {}
 
-        if payment_methods := self._find_payment_methods(message.text):
-            query['payment_methods'] = [payment_method.value for payment_method in payment_methods]
+        if btc_offers_query.payment_methods:
+            query['payment_methods'] = [payment_method.value for payment_method in btc_offers_query.payment_methods]
 
-        if exchanges := self._find_exchanges(message.text):
-            query['exchanges'] = [exchange.value for exchange in exchanges]
+        if btc_offers_query.exchanges:
+            query['exchanges'] = [exchange.value for exchange in btc_offers_query.exchanges]
 
-        if eur_mode:
-            query['max_price_eur'] = parsed_number
+        if btc_offers_query.mode is BtcOffersMode.EUR:
+            query['max_price_eur'] = btc_offers_query.number
             query['limit'] = constants.BTC_OFFERS_MAX_LIMIT
-        elif usd_mode:
-            query['max_price_usd'] = parsed_number
+        elif btc_offers_query.mode is BtcOffersMode.USD:
+            query['max_price_usd'] = btc_offers_query.number
             query['limit'] = constants.BTC_OFFERS_MAX_LIMIT
-        elif premium_mode:
-            query['max_premium'] = parsed_number
+        elif btc_offers_query.mode is BtcOffersMode.PREMIUM:
+            query['max_premium'] = btc_offers_query.number
             query['limit'] = constants.BTC_OFFERS_MAX_LIMIT
-        elif parsed_number:
-            query['limit'] = min(parsed_number, constants.BTC_OFFERS_MAX_LIMIT)
+        elif btc_offers_query.number:
+            query['limit'] = min(btc_offers_query.number, constants.BTC_OFFERS_MAX_LIMIT)
         else:
             query['limit'] = constants.BTC_OFFERS_DEFAULT_LIMIT
 
@@ -119,26 +96,35 @@ class BtcOffersBot(MultiBot, ABC):
         self._btc_offers_api_endpoint = (
             f'{os.environ['BTC_OFFERS_API_HOST']}:{os.environ['BTC_OFFERS_API_PORT']}'
         )
+        self._btc_offers_connection_task: asyncio.Task[None] | None = None
         self._btc_offers_lock = asyncio.Lock()
         self._btc_offers_notifications_task: asyncio.Task[None] | None = None
+        self._btc_offers_session: aiohttp.ClientSession | None = None
+        self._btc_offers_snapshot: tuple[DatedOffers, float] | None = None
+        self._btc_offers_snapshot_task: asyncio.Task[DatedOffers] | None = None
         self._btc_offers_websocket: websockets.ClientConnection | None = None
-        self._payment_method_keyword_max_words = 0
-        self._payment_methods_keywords_groups = {}
-
-        for payment_method, payment_method_keywords in constants.KEYWORDS['btc_offers_payment_methods'].items():
-            payment_method_keywords_groups = defaultdict(set)
-
-            for payment_method_keyword in payment_method_keywords:
-                keyword_words = payment_method_keyword.split()
 
-                if len(keyword_words) > self._payment_method_keyword_max_words:
-                    self._payment_method_keyword_max_words = len(keyword_words)
-
-                payment_method_keywords_groups[len(keyword_words)].add(payment_method_keyword)
-
-            self._payment_methods_keywords_groups[payment_method] = sorted(
-                payment_method_keywords_groups.items(), key=lambda item: -item[0]
-            )
+        btc_offers_modes_keywords = {
+            BtcOffersMode.EUR: constants.KEYWORDS['eur'],
+            BtcOffersMode.USD: constants.KEYWORDS['usd'],
+            BtcOffersMode.PREMIUM: constants.KEYWORDS['premium']
+        }
+        # symbols like € don't survive the text normalization, they are looked up in the raw text
+        self._btc_offers_mode_symbols = {
+            keyword: mode
+            for mode, keywords in btc_offers_modes_keywords.items()
+            for keyword in keywords
+            if not keyword.isalnum()
+        }
+        self._btc_offers_terms_index = KeywordIndex(
+            btc_offers_modes_keywords | constants.KEYWORDS['btc_offers_exchanges'],
+            multibot_constants.PARSER_MIN_SCORE_DEFAULT,
+            exclusive=False
+        )
+        self._payment_methods_index = KeywordIndex(
+            constants.KEYWORDS['btc_offers_payment_methods'],
+            multibot_constants.PARSER_MIN_SCORE_DEFAULT
+        )
 
     # -------------------------------------------------------- #
     # ------------------- PROTECTED METHODS ------------------ #
@@ -190,46 +176,44 @@ class BtcOffersBot(MultiBot, ABC):
         await self._send_blocked_btc_offer_elements(chat)
 
     async def _cancel_btc_offers_notifications_task(self) -> None:
+        if self._btc_offers_connection_task and not self._btc_offers_connection_task.done():
+            self._btc_offers_connection_task.cancel()
+
         if self._btc_offers_notifications_task and not self._btc_offers_notifications_task.done():
             self._btc_offers_notifications_task.cancel()
             await asyncio.sleep(0)
 
-    def _find_chats_to_notify(self) -> list[Chat]:
-        return self.Chat.find({'platform': self.platform.value, 'btc_offers.query': {'$exists': True, '$ne': {}}})
-
-    @staticmethod
-    def _find_exchanges(text: str) -> list[Exchange]:
-        exchanges = []
-        normalized_text = flanautils.remove_accents(text.lower())
-
-        for exchange, exchange_keywords in constants.KEYWORDS['btc_offers_exchanges'].items():
-            for exchange_keyword in exchange_keywords:
-                if flanautils.cartesian_product_string_matching(
-                    normalized_text,
-                    exchange_keyword,
-                    multibot_constants.PARSER_MIN_SCORE_DEFAULT
-                ):
-                    exchanges.append(exchange)
-                    break
-
-        return exchanges
+    async def _connect_btc_offers_websocket(self) -> None:
+        retry_delay = constants.BTC_OFFERS_WEBSOCKET_MIN_RETRY_DELAY_SECONDS
+        while True:
+            # refused connections, timeouts, dns and network errors are all OSError
+            try:
+                websocket = await websockets.connect(f'ws://{self._btc_offers_api_endpoint}/ws/offers/notifications')
+            except (OSError, websockets.InvalidHandshake):
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(2 * retry_delay, constants.BTC_OFFERS_WEBSOCKET_MAX_RETRY_DELAY_SECONDS)
+            else:
+                break
 
-    @staticmethod
-    def _generate_ngrams(text: str, max_n: int) -> defaultdict[int, set[str]]:
-        ngrams = defaultdict(set)
+        async with self._btc_offers_lock:
+            self._btc_offers_websocket = websocket
 
-        words = text.split()
+            if not self._btc_offers_notifications_task or self._btc_offers_notifications_task.done():
+                self._btc_offers_notifications_task = asyncio.create_task(self._wait_btc_offers_notification())
 
-        for n in range(1, max_n + 1):
-            n_ngrams = set()
+        # a new connection has no subscriptions, so every stored query is sent again
+        await self._send_btc_offers_subscriptions(await asyncio.to_thread(self._find_chats_to_notify))
 
-            for i in range(len(words) - n + 1):
-                n_ngrams.add(' '.join(words[i:i + n]))
+    def _ensure_btc_offers_websocket(self) -> asyncio.Task[None]:
+        # a single connection attempt at a time. The queries are stored before, so it subscribes them when it connects
+        # and nobody has to wait for it
+        if not self._btc_offers_connection_task or self._btc_offers_connection_task.done():
+            self._btc_offers_connection_task = asyncio.create_task(self._connect_btc_offers_websocket())
 
-            if n_ngrams:
-                ngrams[n] = n_ngrams
+        return self._btc_offers_connection_task
 
-        return ngrams
+    def _find_chats_to_notify(self) -> list[Chat]:
+        return self.Chat.find({'platform': self.platform.value, 'btc_offers.query': {'$exists': True, '$ne': {}}})
 
     @staticmethod
     def _normalize_text(text: str) -> str:
@@ -240,28 +224,6 @@ class BtcOffersBot(MultiBot, ABC):
             ).split()
         )
 
-    def _find_payment_methods(self, text: str) -> list[PaymentMethod]:
-        normalized_text = self._normalize_text(text)
-        text_ngrams = self._generate_ngrams(normalized_text, self._payment_method_keyword_max_words)
-        payment_methods = []
-
-        for payment_method, payment_method_keywords_groups in self._payment_methods_keywords_groups.items():
-            for group_word_count, payment_method_keywords_group in payment_method_keywords_groups:
-                for payment_method_keyword in payment_method_keywords_group:
-                    for text_ngram in text_ngrams[group_word_count]:
-                        if flanautils.cartesian_product_string_matching(
-                            (payment_method_keyword,),
-                            (text_ngram,),
-                            min_score=multibot_constants.PARSER_MIN_SCORE_DEFAULT
-                        ):
-                            if payment_method not in payment_methods:
-                                payment_methods.append(payment_method)
-
-                            normalized_text = normalized_text.replace(text_ngram, '')
-                            text_ngrams = self._generate_ngrams(normalized_text, self._payment_method_keyword_max_words)
-
-        return payment_methods
-
     @staticmethod
     def _format_blocked_btc_offer_elements_section(chat: Chat | Message, elements_name: str, title: str) -> str | None:
         if not (elements := chat.btc_offers[elements_name]):
@@ -274,6 +236,82 @@ class BtcOffersBot(MultiBot, ABC):
             )
         )
 
+    @staticmethod
+    def _format_btc_offer(i: int, offer: dict[str, Any]) -> str:
+        offer_parts = [
+            f'<b>{i}.</b>',
+            f'<b>Plataforma:</b> <code>{offer['exchange']}</code>',
+            f'<b>Id:</b> <code>{offer['id']}</code>'
+        ]
+
+        payment_methods_text = ''.join(
+            f'\n    <code>{payment_method}</code>' for payment_method in offer['payment_methods']
+        )
+
+        offer_parts.extend(
+            (
+                f'<b>Cantidad:</b> <code>{offer['fiat_amount']}</code>',
+                f'<b>Precio (EUR):</b> <code>{offer['price_eur']:.2f} €</code>',
+                f'<b>Precio (USD):</b> <code>{offer['price_usd']:.2f} $</code>',
+                f'<b>Prima:</b> <code>{flanautils.format_decimal(offer['premium'], decimals=2)} %</code>',
+                f'<b>Métodos de pago:</b>{payment_methods_text}'
+            )
+        )
+
+        if offer['author']:
+            offer_parts.append(f'<b>Autor:</b> <code>{offer['author']}</code>')
+
+        if offer['trades'] is not None:
+            offer_parts.append(f'<b>Nº de operaciones:</b> <code>{offer['trades']}</code>')
+
+        if offer['rating'] is not None:
+            offer_parts.append(
+                f'<b>Valoración:</b> <code>{flanautils.format_decimal(offer['rating'] * 100, decimals=2)} %</code>'
+            )
+
+        if offer['url']:
+            offer_parts.append(f'<b>Url:</b> {offer['url']}')
+
+        if offer['description']:
+            offer_parts.append(f'<b>Descripción:</b>\n<blockquote>{offer['description']}</blockquote>')
+
+        return '\n'.join(offer_parts)
+
+    @staticmethod
+    def _format_collapsed_btc_offer(i: int, offer: dict[str, Any]) -> str:
+        offer_parts = [
+            f'<b>{i}.</b> <code>{offer['exchange']}</code>',
+            f'<code>{offer['fiat_amount']}</code>',
+            f'<code>{offer['price_eur']:.2f} €</code>',
+            f'<code>{flanautils.format_decimal(offer['premium'], decimals=2)} %</code>',
+            ', '.join(offer['payment_methods'])
+        ]
+
+        if offer['url']:
+            offer_parts.append(offer['url'])
+
+        return ' · '.join(offer_parts)
+
+    async def _get_btc_offers(self, query: dict[str, float | list[str]]) -> DatedOffers:
+        # every chat is answered from the same snapshot, filtered with its own query
+        snapshot = await self._get_btc_offers_snapshot()
+
+        # the api may return fewer offers than the limit asked for, so only an empty book proves the snapshot complete
+        if snapshot.offers:
+            return await self._request_btc_offers(query)
+
+        return DatedOffers(BtcOffersFilter.from_query(query).apply(snapshot.offers), snapshot.updated_at)
+
+    async def _get_btc_offers_snapshot(self) -> DatedOffers:
+        if self._btc_offers_snapshot and time.monotonic() < self._btc_offers_snapshot[1]:
+            return self._btc_offers_snapshot[0]
+
+        # requests made while the snapshot is in flight wait for the same response
+        if not self._btc_offers_snapshot_task or self._btc_offers_snapshot_task.done():
+            self._btc_offers_snapshot_task = asyncio.create_task(self._request_btc_offers_snapshot())
+
+        return await asyncio.shield(self._btc_offers_snapshot_task)
+
     def _is_websocket_connected(self) -> bool:
         return (
             self._btc_offers_websocket
@@ -281,6 +319,98 @@ class BtcOffersBot(MultiBot, ABC):
             self._btc_offers_websocket.state in {websockets.State.CONNECTING, websockets.State.OPEN}
         )
 
+    async def _notify_btc_offers(self, chat: Chat, data: dict) -> None:
+        await asyncio.to_thread(chat.pull_from_database, overwrite_fields=('btc_offers',))
+        chat.btc_offers['query'] = {}
+        await asyncio.to_thread(chat.save)
+
+        await self._send_btc_offers(DatedOffers.from_dict(data['dated_offers']), chat, notifications_disabled=True)
+
+    def _open_btc_offers_session(self) -> None:
+        # _on_ready runs again on every reconnection, the session lives as long as the bot
+        if not self._btc_offers_session or self._btc_offers_session.closed:
+            self._btc_offers_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=constants.BTC_OFFERS_API_CONNECTIONS_PER_HOST,
+                    ttl_dns_cache=constants.BTC_OFFERS_API_DNS_CACHE_SECONDS,
+                    keepalive_timeout=constants.BTC_OFFERS_API_KEEPALIVE_SECONDS
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=constants.BTC_OFFERS_API_TIMEOUT_SECONDS,
+                    connect=constants.BTC_OFFERS_API_CONNECT_TIMEOUT_SECONDS
+                )
+            )
+
+    @staticmethod
+    def _pack_texts(texts: Iterable[str], separator: str, max_characters: int) -> list[str]:
+        packed_texts = []
+
+        for text in texts:
+            if packed_texts and len(packed_texts[-1]) + len(separator) + len(text) <= max_characters:
+                packed_texts[-1] += f'{separator}{text}'
+            else:
+                packed_texts.append(text)
+
+        return packed_texts
+
+    def _parse_btc_offers_query(self, text: str) -> BtcOffersQuery:
+        normalized_text = self._normalize_text(text)
+        btc_offers_query = BtcOffersQuery(
+            modes={mode for symbol, mode in self._btc_offers_mode_symbols.items() if symbol in text},
+            number=flanautils.text_to_number(text, accept_comma=True),
+            payment_methods=self._payment_methods_index.find(normalized_text)
+        )
+
+        for term in self._btc_offers_terms_index.find(normalized_text):
+            match term:
+                case BtcOffersMode():
+                    btc_offers_query.modes.add(term)
+                case Exchange():
+                    btc_offers_query.exchanges.append(term)
+
+        return btc_offers_query
+
+    async def _request_btc_offers(self, query: dict[str, float | list[str]]) -> DatedOffers:
+        query = query.copy()
+        query['ignore_ids'] = [urllib.parse.quote(id) for id in query['ignore_ids']]
+        query['ignore_authors'] = [urllib.parse.quote(author) for author in query['ignore_authors']]
+        query['ignore_descriptions'] = [urllib.parse.quote(description) for description in query['ignore_descriptions']]
+
+        async with self._btc_offers_session.get(
+            f'http://{self._btc_offers_api_endpoint}/offers',
+            params=query
+        ) as response:
+            return DatedOffers.from_dict(await response.json())
+
+    async def _request_btc_offers_snapshot(self) -> DatedOffers:
+        async with self._btc_offers_session.get(
+            f'http://{self._btc_offers_api_endpoint}/offers',
+            params={'limit': constants.BTC_OFFERS_SNAPSHOT_LIMIT}
+        ) as response:
+            dated_offers = DatedOffers.from_dict(await response.json())
+
+        # the ttl counts from the fetch, the api updated_at can be old when the offers haven't changed
+        self._btc_offers_snapshot = (dated_offers, time.monotonic() + constants.BTC_OFFERS_CACHE_TTL_SECONDS)
+
+        return dated_offers
+
+    async def _run_btc_offers_notification_worker(self, queue: asyncio.Queue[dict]) -> None:
+        while True:
+            data = await queue.get()
+            chat = None
+
+            try:
+                chat = await self.get_chat(data['chat_id'])
+                await self._notify_btc_offers(chat, data)
+            except Exception as e:
+                # the worker outlives any failed notification, even if the error can't be reported
+                try:
+                    await self._manage_exceptions(e, chat or await self.owner_chat, print_traceback=True)
+                except Exception:
+                    logging.exception('BTC offers notification error for chat %s', data.get('chat_id'))
+            finally:
+                queue.task_done()
+
     async def _send_blocked_btc_offer_elements(self, chat: Chat | Message) -> None:
         match chat:
             case self.Message() as message:
@@ -310,48 +440,6 @@ class BtcOffersBot(MultiBot, ABC):
         chat: Chat,
         notifications_disabled: bool = False
     ) -> None:
-        offers_parts = []
-
-        for i, offer in enumerate(dated_offers.offers, start=1):
-            offer_parts = [
-                f'<b>{i}.</b>',
-                f'<b>Plataforma:</b> <code>{offer['exchange']}</code>',
-                f'<b>Id:</b> <code>{offer['id']}</code>'
-            ]
-
-            payment_methods_text = ''.join(
-                f'\n    <code>{payment_method}</code>' for payment_method in offer['payment_methods']
-            )
-
-            offer_parts.extend(
-                (
-                    f'<b>Cantidad:</b> <code>{offer['fiat_amount']}</code>',
-                    f'<b>Precio (EUR):</b> <code>{offer['price_eur']:.2f} €</code>',
-                    f'<b>Precio (USD):</b> <code>{offer['price_usd']:.2f} $</code>',
-                    f'<b>Prima:</b> <code>{flanautils.format_decimal(offer['premium'], decimals=2)} %</code>',
-                    f'<b>Métodos de pago:</b>{payment_methods_text}'
-                )
-            )
-
-            if offer['author']:
-                offer_parts.append(f'<b>Autor:</b> <code>{offer['author']}</code>')
-
-            if offer['trades'] is not None:
-                offer_parts.append(f'<b>Nº de operaciones:</b> <code>{offer['trades']}</code>')
-
-            if offer['rating'] is not None:
-                offer_parts.append(
-                    f'<b>Valoración:</b> <code>{flanautils.format_decimal(offer['rating'] * 100, decimals=2)} %</code>'
-                )
-
-            if offer['url']:
-                offer_parts.append(f'<b>Url:</b> {offer['url']}')
-
-            if offer['description']:
-                offer_parts.append(f'<b>Descripción:</b>\n<blockquote>{offer['description']}</blockquote>')
-
-            offers_parts.append(offer_parts)
-
         if dated_offers.updated_at:
             elapsed_time = datetime.datetime.now(datetime.UTC) - dated_offers.updated_at
             elapsed_seconds = int(elapsed_time.total_seconds())
@@ -371,37 +459,73 @@ class BtcOffersBot(MultiBot, ABC):
         else:
             elapsed_time_description = ''
 
-        message_data = {'btc_offers': True}
-
-        await self.send(f'<b>💰💰💰 OFERTAS BTC 💰💰💰</b>{elapsed_time_description}', chat, data=message_data)
-
-        for offer_parts in offers_parts:
-            await self.send('\n'.join(offer_parts), chat, data=message_data, enable_link_previews=False)
+        max_characters = constants.BTC_OFFERS_MESSAGE_MAX_CHARACTERS[self.platform]
+        texts = [f'<b>💰💰💰 OFERTAS BTC 💰💰💰</b>{elapsed_time_description}']
+
+        if chat.config.get('btc_offers_collapsed'):
+            texts.extend(
+                f'<blockquote>{text}</blockquote>'
+                for text in self._pack_texts(
+                    (
+                        self._format_collapsed_btc_offer(i, offer)
+                        for i, offer in enumerate(dated_offers.offers, start=1)
+                    ),
+                    '\n',
+                    max_characters - len('<blockquote></blockquote>')
+                )
+            )
+        else:
+            texts.extend(self._format_btc_offer(i, offer) for i, offer in enumerate(dated_offers.offers, start=1))
 
         if notifications_disabled:
-            await self.send(
+            texts.append(
                 f'{'-' * 70}\n'
-                '<b>ℹ️ Los avisos de ofertas BTC se han eliminado. Si quieres volver a recibirlos, no dudes en pedírmelo.</b>',
-                chat,
-                data=message_data
+                '<b>ℹ️ Los avisos de ofertas BTC se han eliminado. Si quieres volver a recibirlos, no dudes en pedírmelo.</b>'
             )
 
+        # as few messages as the platform allows, sent one after another so they arrive in order
+        message_data = {'btc_offers': True}
+        for text in self._pack_texts(texts, '\n\n', max_characters):
+            await self.send(text, chat, data=message_data, enable_link_previews=False)
+
+    async def _send_btc_offers_subscriptions(self, chats: list[Chat]) -> None:
+        # the queries are already stored, so the chats aren't saved again. If the connection closes meanwhile,
+        # _wait_btc_offers_notification reconnects and sends them all again
+        try:
+            for chat in chats:
+                await self._btc_offers_websocket.send(
+                    json.dumps({'action': 'start', 'chat_id': chat.id, 'query': chat.btc_offers['query']})
+                )
+        except websockets.ConnectionClosed:
+            pass
+
     async def _wait_btc_offers_notification(self) -> None:
-        while True:
+        queues = [
+            asyncio.Queue(constants.BTC_OFFERS_NOTIFICATION_QUEUE_SIZE)
+            for _ in range(constants.BTC_OFFERS_NOTIFICATION_WORKERS)
+        ]
+        workers = [asyncio.create_task(self._run_btc_offers_notification_worker(queue)) for queue in queues]
+
+        try:
             while True:
                 try:
                     data = json.loads(await self._btc_offers_websocket.recv())
                 except websockets.ConnectionClosed:
-                    await self.start_all_btc_offers_notifications()
-                else:
-                    break
+                    if not await asyncio.to_thread(self._find_chats_to_notify):
+                        break
 
-            chat = await self.get_chat(data['chat_id'])
-            chat.pull_from_database(overwrite_fields=('btc_offers',))
-            chat.btc_offers['query'] = {}
-            chat.save()
+                    await self._ensure_btc_offers_websocket()
+                    continue
+
+                # the notifications of a chat always go to the same worker, so they keep their order. If that worker
+                # falls behind, put waits and stops reading the websocket until there is room again
+                await queues[hash(data['chat_id']) % len(queues)].put(data)
 
-            await self._send_btc_offers(DatedOffers.from_dict(data['dated_offers']), chat, notifications_disabled=True)
+            for queue in queues:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
 
     # ---------------------------------------------- #
     #                    HANDLERS                    #
@@ -432,23 +556,19 @@ class BtcOffersBot(MultiBot, ABC):
 
     @preprocess_btc_offers
     async def _on_btc_offers(self, message: Message, query: dict[str, float | list[str]]) -> None:
-        query['ignore_ids'] = [urllib.parse.quote(id) for id in query['ignore_ids']]
-        query['ignore_authors'] = [urllib.parse.quote(author) for author in query['ignore_authors']]
-        query['ignore_descriptions'] = [urllib.parse.quote(description) for description in query['ignore_descriptions']]
-
         bot_state_message = await self.send('Obteniendo ofertas BTC...', message)
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f'http://{self._btc_offers_api_endpoint}/offers', params=query) as response:
-                    dated_offers = DatedOffers.from_dict(await response.json())
-            except aiohttp.ClientConnectorError:
-                await self.send_error('❌🌐 El servidor de ofertas BTC no está disponible.', bot_state_message, edit=True)
-                return
+        try:
+            dated_offers = await self._get_btc_offers(query)
+        except (aiohttp.ClientConnectorError, TimeoutError):
+            await self.send_error('❌🌐 El servidor de ofertas BTC no está disponible.', bot_state_message, edit=True)
+            return
 
         if dated_offers:
-            await self._send_btc_offers(dated_offers, message.chat)
-            await self.delete_message(bot_state_message)
+            await asyncio.gather(
+                self._send_btc_offers(dated_offers, message.chat),
+                self.delete_message(bot_state_message)
+            )
         else:
             await self.edit('ℹ️🔍 No hay ofertas BTC actualmente que cumplan esa condición.', bot_state_message)
 
@@ -485,6 +605,9 @@ class BtcOffersBot(MultiBot, ABC):
 
     async def _on_ready(self) -> None:
         await super()._on_ready()
+
+        self._open_btc_offers_session()
+
         asyncio.create_task(self.start_all_btc_offers_notifications())
 
     async def _on_stop_btc_offers_notification(self, message: Message) -> None:
@@ -503,10 +626,16 @@ class BtcOffersBot(MultiBot, ABC):
     # -------------------------------------------------------- #
     # -------------------- PUBLIC METHODS -------------------- #
     # -------------------------------------------------------- #
+    async def close_btc_offers_session(self) -> None:
+        if self._btc_offers_session:
+            await self._btc_offers_session.close()
+
     async def start_all_btc_offers_notifications(self) -> None:
-        if chats := self._find_chats_to_notify():
-            for chat in chats:
-                await self.start_btc_offers_notification(chat, chat.btc_offers['query'])
+        if chats := await asyncio.to_thread(self._find_chats_to_notify):
+            if self._is_websocket_connected():
+                await self._send_btc_offers_subscriptions(chats)
+            else:
+                self._ensure_btc_offers_websocket()
         else:
             await self._cancel_btc_offers_notifications_task()
 
@@ -514,25 +643,13 @@ class BtcOffersBot(MultiBot, ABC):
         chat.btc_offers['query'] = query
         chat.save()
 
-        async with self._btc_offers_lock:
-            if not self._is_websocket_connected():
-                while True:
-                    try:
-                        self._btc_offers_websocket = await websockets.connect(
-                            f'ws://{self._btc_offers_api_endpoint}/ws/offers/notifications'
-                        )
-                    except ConnectionRefusedError:
-                        await asyncio.sleep(constants.BTC_OFFERS_WEBSOCKET_RETRY_DELAY_SECONDS)
-                    else:
-                        break
-
-        if not self._btc_offers_notifications_task or self._btc_offers_notifications_task.done():
-            self._btc_offers_notifications_task = asyncio.create_task(self._wait_btc_offers_notification())
-
-        await self._btc_offers_websocket.send(json.dumps({'action': 'start', 'chat_id': chat.id, 'query': query}))
+        if self._is_websocket_connected():
+            await self._send_btc_offers_subscriptions([chat])
+        else:
+            self._ensure_btc_offers_websocket()
 
     async def stop_all_btc_offers_notification(self) -> None:
-        for chat in self._find_chats_to_notify():
+        for chat in await asyncio.to_thread(self._find_chats_to_notify):
             await self.stop_btc_offers_notification(chat)
 
         await self._cancel_btc_offers_notifications_task()
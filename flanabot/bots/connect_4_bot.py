@@ -1,52 +1,79 @@
 __all__ = ['Connect4Bot']
 
 import asyncio
-import copy
+import functools
+import multiprocessing
 import random
+import time
 from abc import ABC
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Iterable
 
+import flanautils
 from flanautils import Media, MediaType, Source
-from multibot import MultiBot
+from multibot import MultiBot, constants as multibot_constants
 
-from flanabot import connect_4_frontend, constants
-from flanabot.models import ButtonsGroup, Message, Player
+from flanabot import connect_4_frontend, connect_4_solver, constants
+from flanabot.connect_4_engine import Connect4Board
+from flanabot.connect_4_opening_book import Connect4OpeningBook
+from flanabot.models import ButtonsGroup, Connect4Difficulty, Message, Player
 
 
 # ----------------------------------------------------------------------------------------------------- #
 # ------------------------------------------- CONNECT_4_BOT ------------------------------------------- #
 # ----------------------------------------------------------------------------------------------------- #
 class Connect4Bot(MultiBot, ABC):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # games against itself have no queue of button presses
+        self._connect_4_games: dict[tuple, tuple[asyncio.Queue[tuple[Message, int, int]] | None, asyncio.Task]] = {}
+        self._connect_4_opening_book = Connect4OpeningBook()
+        # a running search stops when its flag is set, the worker processes read them from shared memory
+        self._connect_4_search_stop_flags = multiprocessing.RawArray('b', constants.CONNECT_4_SEARCH_STOP_SLOTS)
+        self._connect_4_free_search_stop_slots = list(range(constants.CONNECT_4_SEARCH_STOP_SLOTS))
+        # workers are only started on first use
+        self._connect_4_render_executor = ThreadPoolExecutor(constants.CONNECT_4_RENDER_WORKERS, 'connect_4_render')
+        self._connect_4_search_executor = ProcessPoolExecutor(
+            constants.CONNECT_4_SEARCH_WORKERS,
+            initializer=connect_4_solver.init_search_process,
+            initargs=(self._connect_4_search_stop_flags,)
+        )
+
     # -------------------------------------------------------- #
     # ------------------- PROTECTED METHODS ------------------ #
     # -------------------------------------------------------- #
     def _add_handlers(self):
         super()._add_handlers()
 
+        difficulty_keywords = (*constants.KEYWORDS['easy'], *constants.KEYWORDS['medium'], *constants.KEYWORDS['hard'])
+
         self.register(self._on_connect_4, keywords=constants.KEYWORDS['connect_4'])
+        self.register(self._on_connect_4, keywords=(*constants.KEYWORDS['connect_4'], difficulty_keywords))
 
         self.register(self._on_connect_4_vs_itself, keywords=(*constants.KEYWORDS['connect_4'], *constants.KEYWORDS['self']))
+        self.register(self._on_connect_4_vs_itself, keywords=(*constants.KEYWORDS['connect_4'], *constants.KEYWORDS['self'], difficulty_keywords))
 
         self.register_button(self._on_connect_4_button_press, key=ButtonsGroup.CONNECT_4)
 
+    @classmethod
     def _ai_insert(
-        self,
+        cls,
         current_player_num: int,
         next_player_num: int,
-        board: list[list[int | None]]
+        board: Connect4Board
     ) -> tuple[int, int]:
-        available_positions_ = self._available_positions(board)
+        available_positions_ = cls._available_positions(board)
 
         # check if current player can win
         for i, j in available_positions_:
-            if current_player_num in self._check_winners(i, j, board):
-                return self.insert_piece(j, current_player_num, board)
+            if current_player_num in cls._check_winners(i, j, board):
+                return cls.insert_piece(j, current_player_num, board)
 
         # check if next player can win
         for i, j in available_positions_:
-            if next_player_num in self._check_winners(i, j, board):
-                return self.insert_piece(j, current_player_num, board)
+            if next_player_num in cls._check_winners(i, j, board):
+                return cls.insert_piece(j, current_player_num, board)
 
         # future possibility (above the move)
         next_player_winning_positions_above = []
@@ -55,9 +82,9 @@ class Connect4Bot(MultiBot, ABC):
             if i < 1:
                 continue
 
-            board_copy = copy.deepcopy(board)
-            board_copy[i][j] = current_player_num
-            winners = self._check_winners(i - 1, j, board_copy)
+            board.insert(j, current_player_num)
+            winners = cls._check_winners(i - 1, j, board)
+            board.remove(j)
             if next_player_num in winners:
                 next_player_winning_positions_above.append((i, j))
             elif current_player_num in winners:
@@ -68,36 +95,38 @@ class Connect4Bot(MultiBot, ABC):
             if (i, j) in next_player_winning_positions_above:
                 continue
 
-            board_copy = copy.deepcopy(board)
-            board_copy[i][j] = current_player_num
-            if len(self._winning_positions(board_copy)[current_player_num]) >= 2:
-                return self.insert_piece(j, current_player_num, board)
+            board.insert(j, current_player_num)
+            n_winning_positions = board.n_winning_positions(current_player_num)
+            board.remove(j)
+            if n_winning_positions >= 2:
+                return cls.insert_piece(j, current_player_num, board)
 
         # check if after the next player moves, he will have 2 positions to win
         for i, j in available_positions_:
             if (i, j) in current_player_winning_positions_above:
                 continue
 
-            board_copy = copy.deepcopy(board)
-            board_copy[i][j] = next_player_num
-            future_winning_positions = self._winning_positions(board_copy)[next_player_num]
-            if len(future_winning_positions) < 2:
+            board.insert(j, next_player_num)
+            if board.n_winning_positions(next_player_num) < 2:
+                board.remove(j)
                 continue
+            future_winning_positions = cls._winning_positions(board)[next_player_num]
+            board.remove(j)
 
             if (i, j) not in next_player_winning_positions_above:
-                return self.insert_piece(j, current_player_num, board)
+                return cls.insert_piece(j, current_player_num, board)
             for i_2, j_2 in future_winning_positions:
                 if (i_2, j_2) in available_positions_ and (i_2, j_2) not in next_player_winning_positions_above:
-                    return self.insert_piece(j_2, current_player_num, board)
+                    return cls.insert_piece(j_2, current_player_num, board)
 
         good_positions = [pos for pos in available_positions_ if pos not in next_player_winning_positions_above and pos not in current_player_winning_positions_above]
         if good_positions:
-            j = random.choice(self._best_moves(good_positions, current_player_num, board))[1]
+            j = random.choice(cls._best_moves(good_positions, current_player_num, board))[1]
         elif current_player_winning_positions_above:
-            j = random.choice(self._best_moves(current_player_winning_positions_above, current_player_num, board))[1]
+            j = random.choice(cls._best_moves(current_player_winning_positions_above, current_player_num, board))[1]
         else:
-            j = random.choice(self._best_moves(next_player_winning_positions_above, current_player_num, board))[1]
-        return self.insert_piece(j, current_player_num, board)
+            j = random.choice(cls._best_moves(next_player_winning_positions_above, current_player_num, board))[1]
+        return cls.insert_piece(j, current_player_num, board)
 
     async def _ai_turn(
         self,
@@ -107,17 +136,27 @@ class Connect4Bot(MultiBot, ABC):
         next_player: Player,
         next_turn: int,
         delay: float,
-        board: list[list[int | None]],
-        message: Message
+        board: Connect4Board,
+        message: Message,
+        difficulty: Connect4Difficulty = Connect4Difficulty.EASY
     ) -> bool:
-        await asyncio.sleep(delay)
-        i, j = self._ai_insert(current_player.number, next_player.number, board)
+        started_at = time.perf_counter()
+        if not (position := await self._search_insert(current_player.number, board, difficulty, delay)):
+            position = self._ai_insert(current_player.number, next_player.number, board)
+        i, j = position
+        await asyncio.sleep(delay - (time.perf_counter() - started_at))
+
+        try:
+            self._encode_connect_4_board(board, message.data['connect_4'])
+        except KeyError:
+            pass
+
         if await self._check_game_finished(i, j, player_1, player_2, next_turn, board, message):
             return True
 
         return not await self.edit(
             Media(
-                connect_4_frontend.make_image(board, next_player, highlight=(i, j)),
+                await self._make_connect_4_image(board, next_player, highlight=(i, j)),
                 MediaType.IMAGE,
                 'png',
                 Source.LOCAL
@@ -126,25 +165,19 @@ class Connect4Bot(MultiBot, ABC):
         )
 
     @staticmethod
-    def _available_positions(board: list[list[int | None]]) -> list[tuple[int, int]]:
-        available_positions = []
-        for j in range(constants.CONNECT_4_N_COLUMNS):
-            for i in range(constants.CONNECT_4_N_ROWS - 1, -1, -1):
-                if board[i][j] is None:
-                    available_positions.append((i, j))
-                    break
-
-        return available_positions
+    def _available_positions(board: Connect4Board) -> list[tuple[int, int]]:
+        return board.available_positions()
 
-    # noinspection DuplicatedCode
     @staticmethod
     def _best_moves(
         possible_positions: Iterable[tuple[int, int]],
         player_num: int,
-        board: list[list[int | None]]
+        board: Connect4Board
     ) -> list[tuple[int, int]]:
         best_moves = []
         max_points = float('-inf')
+        player_bitboard = board.bitboards[player_num - 1]
+        opponent_bitboard = board.bitboards[2 - player_num]
 
         for i, j in possible_positions:
             if 3 <= j <= constants.CONNECT_4_N_COLUMNS - 4:
@@ -152,109 +185,11 @@ class Connect4Bot(MultiBot, ABC):
             else:
                 points = 0
 
-            # left
-            for j_left in range(j - 1, j - 4, -1):
-                if j_left < 0:
-                    points -= 1
-                    break
-                if board[i][j_left] is not None:
-                    if board[i][j_left] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # right
-            for j_right in range(j + 1, j + 4):
-                if j_right >= constants.CONNECT_4_N_COLUMNS:
-                    points -= 1
-                    break
-                if board[i][j_right] is not None:
-                    if board[i][j_right] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # up
-            for i_up in range(i - 1, i - 4, -1):
-                if i_up < 0:
-                    points -= 1
-                    break
-                if board[i_up][j] is not None:
-                    if board[i_up][j] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # down
-            for i_down in range(i + 1, i + 4):
-                if i_down >= constants.CONNECT_4_N_ROWS:
-                    points -= 1
-                    break
-                if board[i_down][j] is not None:
-                    if board[i_down][j] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # up left
-            for n in range(1, 4):
-                i_up = i - n
-                j_left = j - n
-                if i_up < 0 or j_left < 0:
-                    points -= 1
-                    break
-                if board[i_up][j_left] is not None:
-                    if board[i_up][j_left] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # up right
-            for n in range(1, 4):
-                i_up = i - n
-                j_right = j + n
-                if i_up < 0 or j_right >= constants.CONNECT_4_N_COLUMNS:
-                    points -= 1
-                    break
-                if board[i_up][j_right] is not None:
-                    if board[i_up][j_right] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # down left
-            for n in range(1, 4):
-                i_down = i + n
-                j_left = j - n
-                if i_down >= constants.CONNECT_4_N_ROWS or j_left < 0:
-                    points -= 1
-                    break
-                if board[i_down][j_left] is not None:
-                    if board[i_down][j_left] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
-
-            # down right
-            for n in range(1, 4):
-                i_down = i + n
-                j_right = j + n
-                if i_down >= constants.CONNECT_4_N_ROWS or j_right >= constants.CONNECT_4_N_COLUMNS:
-                    points -= 1
-                    break
-                if board[i_down][j_right] is not None:
-                    if board[i_down][j_right] == player_num:
-                        points += 1
-                    else:
-                        points -= 1
-                        break
+            # every line through the cell still free of opponent pieces is worth 1 plus its own pieces
+            for line_index in board.winning_lines.cell_lines[i][j]:
+                line_mask = board.winning_lines.masks[line_index]
+                if not opponent_bitboard & line_mask:
+                    points += 1 + (player_bitboard & line_mask).bit_count()
 
             if points > max_points:
                 best_moves = [(i, j)]
@@ -271,11 +206,11 @@ class Connect4Bot(MultiBot, ABC):
         player_1: Player,
         player_2: Player,
         turn: int,
-        board: list[list[int | None]],
+        board: Connect4Board,
         message: Message
     ) -> bool:
-        if board[i][j] in self._check_winners(i, j, board):
-            winner, loser = (player_1, player_2) if board[i][j] == player_1.number else (player_2, player_1)
+        if board[i, j] in self._check_winners(i, j, board):
+            winner, loser = (player_1, player_2) if board[i, j] == player_1.number else (player_2, player_1)
             edit_kwargs = {'winner': winner, 'loser': loser, 'win_position': (i, j)}
         elif turn >= constants.CONNECT_4_N_ROWS * constants.CONNECT_4_N_COLUMNS:
             edit_kwargs = {'tie': True}
@@ -289,7 +224,7 @@ class Connect4Bot(MultiBot, ABC):
 
         await self.edit(
             Media(
-                connect_4_frontend.make_image(board, highlight=(i, j), **edit_kwargs),
+                await self._make_connect_4_image(board, highlight=(i, j), **edit_kwargs),
                 MediaType.IMAGE,
                 'png',
                 Source.LOCAL
@@ -301,158 +236,205 @@ class Connect4Bot(MultiBot, ABC):
         return True
 
     @staticmethod
-    def _check_winner_left(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                2 < j and board[i][j - 3] == board[i][j - 2] == board[i][j - 1]
-                or
-                1 < j < constants.CONNECT_4_N_COLUMNS - 1 and board[i][j - 2] == board[i][j - 1] == board[i][j + 1]
-            )
-            and
-            board[i][j - 1] is not None
-        ):
-            return board[i][j - 1]
+    def _check_winners(i: int, j: int, board: Connect4Board) -> set[int]:
+        return board.winners(i, j)
 
     @staticmethod
-    def _check_winner_right(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                j < constants.CONNECT_4_N_COLUMNS - 3 and board[i][j + 1] == board[i][j + 2] == board[i][j + 3]
-                or
-                0 < j < constants.CONNECT_4_N_COLUMNS - 2 and board[i][j - 1] == board[i][j + 1] == board[i][j + 2]
-            )
-            and
-            board[i][j + 1] is not None
-        ):
-            return board[i][j + 1]
+    def _decode_connect_4_board(connect_4_data: dict) -> Connect4Board:
+        try:
+            return Connect4Board.from_bitboards(connect_4_data['bitboards'])
+        except KeyError:
+            # games started before the compact encoding
+            return Connect4Board.from_rows(connect_4_data['board'])
 
     @staticmethod
-    def _check_winner_up(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                2 < i and board[i - 3][j] == board[i - 2][j] == board[i - 1][j]
-                or
-                1 < i < constants.CONNECT_4_N_ROWS - 1 and board[i - 2][j] == board[i - 1][j] == board[i + 1][j]
-            )
-            and
-            board[i - 1][j] is not None
-        ):
-            return board[i - 1][j]
+    def _decode_connect_4_players(connect_4_data: dict) -> tuple[Player, Player]:
+        try:
+            (player_1_id, player_1_name), (player_2_id, player_2_name) = connect_4_data['players']
+        except KeyError:
+            # games started before the compact encoding
+            return Player.from_dict(connect_4_data['player_1']), Player.from_dict(connect_4_data['player_2'])
+
+        return Player(player_1_id, player_1_name, 1), Player(player_2_id, player_2_name, 2)
 
     @staticmethod
-    def _check_winner_down(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                i < constants.CONNECT_4_N_ROWS - 3 and board[i + 1][j] == board[i + 2][j] == board[i + 3][j]
-                or
-                0 < i < constants.CONNECT_4_N_ROWS - 2 and board[i - 1][j] == board[i + 1][j] == board[i + 2][j]
-            )
-            and
-            board[i + 1][j] is not None
-        ):
-            return board[i + 1][j]
+    def _encode_connect_4_board(board: Connect4Board, connect_4_data: dict):
+        connect_4_data['bitboards'] = board.bitboards.copy()
+        connect_4_data.pop('board', None)
 
     @staticmethod
-    def _check_winner_up_left(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                2 < i and 2 < j and board[i - 3][j - 3] == board[i - 2][j - 2] == board[i - 1][j - 1]
-                or
-                1 < i < constants.CONNECT_4_N_ROWS - 1 and 1 < j < constants.CONNECT_4_N_COLUMNS - 1 and board[i - 2][j - 2] == board[i - 1][j - 1] == board[i + 1][j + 1]
+    def _get_connect_4_difficulty(message: Message) -> Connect4Difficulty:
+        for difficulty in (Connect4Difficulty.HARD, Connect4Difficulty.MEDIUM):
+            if flanautils.cartesian_product_string_matching(
+                message.text,
+                constants.KEYWORDS[difficulty.name.lower()],
+                multibot_constants.PARSER_MIN_SCORE_DEFAULT
+            ):
+                return difficulty
 
-            )
-            and
-            board[i - 1][j - 1] is not None
-        ):
-            return board[i - 1][j - 1]
+        return Connect4Difficulty.EASY
 
-    @staticmethod
-    def _check_winner_up_right(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                2 < i and j < constants.CONNECT_4_N_COLUMNS - 3 and board[i - 1][j + 1] == board[i - 2][j + 2] == board[i - 3][j + 3]
-                or
-                1 < i < constants.CONNECT_4_N_ROWS - 1 and 0 < j < constants.CONNECT_4_N_COLUMNS - 2 and board[i + 1][j - 1] == board[i - 1][j + 1] == board[i - 2][j + 2]
-            )
-            and
-            board[i - 1][j + 1] is not None
-        ):
-            return board[i - 1][j + 1]
+    async def _make_connect_4_image(self, board: Connect4Board, *args, **kwargs) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._connect_4_render_executor,
+            functools.partial(connect_4_frontend.make_image, board.copy(), *args, **kwargs)
+        )
 
-    @staticmethod
-    def _check_winner_down_left(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                i < constants.CONNECT_4_N_ROWS - 3 and 2 < j and board[i + 3][j - 3] == board[i + 2][j - 2] == board[i + 1][j - 1]
-                or
-                0 < i < constants.CONNECT_4_N_ROWS - 2 and 1 < j < constants.CONNECT_4_N_COLUMNS - 1 and board[i + 2][j - 2] == board[i + 1][j - 1] == board[i - 1][j + 1]
-            )
-            and
-            board[i + 1][j - 1] is not None
-        ):
-            return board[i + 1][j - 1]
+    async def _play_connect_4_move(self, message: Message, presser_id: int, move_column: int) -> bool:
+        connect_4_data = message.data['connect_4']
 
-    @staticmethod
-    def _check_winner_down_right(i: int, j: int, board: list[list[int | None]]) -> int | None:
-        if (
-            (
-                i < constants.CONNECT_4_N_ROWS - 3 and j < constants.CONNECT_4_N_COLUMNS - 3 and board[i + 1][j + 1] == board[i + 2][j + 2] == board[i + 3][j + 3]
-                or
-                0 < i < constants.CONNECT_4_N_ROWS - 2 and 0 < j < constants.CONNECT_4_N_COLUMNS - 2 and board[i - 1][j - 1] == board[i + 1][j + 1] == board[i + 2][j + 2]
-            )
-            and
-            board[i + 1][j + 1] is not None
-        ):
-            return board[i + 1][j + 1]
+        if not connect_4_data['is_active']:
+            return False
 
-    def _check_winners(self, i: int, j: int, board: list[list[int | None]]) -> set[int]:
-        winners = set()
+        player_1, player_2 = self._decode_connect_4_players(connect_4_data)
+        if connect_4_data['turn'] % 2 == 0:
+            current_player = player_1
+            next_player = player_2
+        else:
+            current_player = player_2
+            next_player = player_1
 
-        if winner := self._check_winner_left(i, j, board):
-            winners.add(winner)
+        if current_player.id != presser_id:
+            return False
 
-        if winner := self._check_winner_up(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        board = self._decode_connect_4_board(connect_4_data)
+        if not board.is_playable(move_column):
+            return False
+        connect_4_data['is_active'] = False
+        difficulty = Connect4Difficulty(connect_4_data.get('difficulty', Connect4Difficulty.EASY.value))
 
-        if winner := self._check_winner_right(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        i, j = self.insert_piece(move_column, current_player.number, board)
+        self._encode_connect_4_board(board, connect_4_data)
+        connect_4_data['turn'] += 1
+        if await self._check_game_finished(i, j, player_1, player_2, connect_4_data['turn'], board, message):
+            return True
 
-        if winner := self._check_winner_down(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        await self.edit(
+            Media(
+                await self._make_connect_4_image(board, next_player, highlight=(i, j)),
+                MediaType.IMAGE,
+                'png',
+                Source.LOCAL
+            ),
+            message
+        )
 
-        if winner := self._check_winner_up_left(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        if player_2.id == self.id:
+            connect_4_data['turn'] += 1
+            if await self._ai_turn(
+                player_1,
+                player_2,
+                next_player,
+                current_player,
+                connect_4_data['turn'],
+                constants.CONNECT_4_AI_DELAY_SECONDS,
+                board,
+                message,
+                difficulty
+            ):
+                return True
 
-        if winner := self._check_winner_up_right(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        connect_4_data['is_active'] = True
 
-        if winner := self._check_winner_down_right(i, j, board):
-            winners.add(winner)
-            if len(winners) == 2:
-                return winners
+        return True
 
-        if winner := self._check_winner_down_left(i, j, board):
-            winners.add(winner)
+    async def _run_connect_4_game(self, game_key: tuple, queue: asyncio.Queue[tuple[Message, int, int]]):
+        try:
+            while not queue.empty():
+                message, presser_id, move_column = queue.get_nowait()
+
+                # the moves run outside the button handler, so their errors are reported here
+                try:
+                    if not await self._play_connect_4_move(message, presser_id, move_column):
+                        continue
+                except Exception as e:
+                    await self._manage_exceptions(e, message, print_traceback=True)
+
+                # the presses received while the move was processed were made on the previous board
+                while not queue.empty():
+                    queue.get_nowait()
+        finally:
+            del self._connect_4_games[game_key]
+
+    async def _run_connect_4_vs_itself_game(
+        self,
+        game_key: tuple,
+        board: Connect4Board,
+        difficulty: Connect4Difficulty,
+        message: Message
+    ):
+        player_1 = Player(self.id, self.name.split('#')[0], 1)
+        player_2 = Player(self.id, self.name.split('#')[0], 2)
+        current_player = player_1
+        next_player = player_2
+        turn = 0
+
+        try:
+            while True:
+                turn += 1
+                # a failed edit (the board was deleted) also ends the game
+                if await self._ai_turn(
+                    player_1,
+                    player_2,
+                    current_player,
+                    next_player,
+                    turn,
+                    constants.CONNECT_4_AI_DELAY_SECONDS / 2,
+                    board,
+                    message,
+                    difficulty
+                ):
+                    break
+                current_player, next_player = next_player, current_player
+        except Exception as e:
+            await self._manage_exceptions(e, message, print_traceback=True)
+        finally:
+            del self._connect_4_games[game_key]
 
-        return winners
+    async def _search_insert(
+        self,
+        player_number: int,
+        board: Connect4Board,
+        difficulty: Connect4Difficulty,
+        time_budget: float
+    ) -> tuple[int, int] | None:
+        if difficulty is Connect4Difficulty.EASY:
+            return
+
+        if board.n_moves % 2 + 1 != player_number or (j := self._connect_4_opening_book.best_move(board)) is None:
+            if self._connect_4_free_search_stop_slots:
+                stop_slot = self._connect_4_free_search_stop_slots.pop()
+                self._connect_4_search_stop_flags[stop_slot] = 0
+            else:
+                stop_slot = None
+
+            future = self._connect_4_search_executor.submit(
+                connect_4_solver.search_best_move,
+                board.to_rows(),
+                player_number,
+                constants.CONNECT_4_SEARCH_DEPTHS[difficulty],
+                time_budget,
+                stop_slot
+            )
+            if stop_slot is not None:
+                # the slot is only reused when its search has finished, not when the game stops waiting for it
+                future.add_done_callback(lambda _: self._connect_4_free_search_stop_slots.append(stop_slot))
+
+            try:
+                j = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # the game was cancelled: a pending search is cancelled with the future and a running one is stopped
+                if stop_slot is not None and not future.done():
+                    self._connect_4_search_stop_flags[stop_slot] = 1
+                raise
+        if j is None:
+            return
 
-    def _winning_positions(self, board: list[list[int | None]]) -> defaultdict[int, list[tuple[int, int]]]:
-        winning_positions: defaultdict[int, list[tuple[int, int]]] = defaultdict(list)
-        for next_i, next_j in self._available_positions(board):
-            for player_number in self._check_winners(next_i, next_j, board):
-                winning_positions[player_number].append((next_i, next_j))
+        return self.insert_piece(j, player_number, board)
 
-        return winning_positions
+    @staticmethod
+    def _winning_positions(board: Connect4Board) -> defaultdict[int, list[tuple[int, int]]]:
+        return board.winning_positions()
 
     # ---------------------------------------------- #
     #                    HANDLERS                    #
@@ -461,7 +443,7 @@ class Connect4Bot(MultiBot, ABC):
         if message.chat.is_group and not self.is_bot_mentioned(message):
             return
 
-        board = [[None for _ in range(constants.CONNECT_4_N_COLUMNS)] for _ in range(constants.CONNECT_4_N_ROWS)]
+        board = Connect4Board()
 
         player_1 = Player(message.author.id, message.author.name.split('#')[0], 1)
         try:
@@ -472,16 +454,16 @@ class Connect4Bot(MultiBot, ABC):
             player_2 = Player(user_2.id, user_2.name.split('#')[0], 2)
 
         await self.send(
-            media=Media(connect_4_frontend.make_image(board, player_1), MediaType.IMAGE, 'png', Source.LOCAL),
+            media=Media(await self._make_connect_4_image(board, player_1), MediaType.IMAGE, 'png', Source.LOCAL),
             message=message,
             buttons=self.distribute_buttons([str(n) for n in range(1, constants.CONNECT_4_N_COLUMNS + 1)]),
             buttons_key=ButtonsGroup.CONNECT_4,
             data={
                 'connect_4': {
                     'is_active': True,
-                    'board': board,
-                    'player_1': player_1.to_dict(),
-                    'player_2': player_2.to_dict(),
+                    'bitboards': board.bitboards.copy(),
+                    'players': [[player_1.id, player_1.name], [player_2.id, player_2.name]],
+                    'difficulty': self._get_connect_4_difficulty(message).value,
                     'turn': 0
                 }
             }
@@ -489,98 +471,65 @@ class Connect4Bot(MultiBot, ABC):
         await self.delete_message(message)
 
     async def _on_connect_4_button_press(self, message: Message):
-        await self.accept_button_event(message)
-
-        connect_4_data = message.data['connect_4']
-
-        is_active = connect_4_data['is_active']
-        board = connect_4_data['board']
-        player_1 = Player.from_dict(connect_4_data['player_1'])
-        player_2 = Player.from_dict(connect_4_data['player_2'])
-
-        if connect_4_data['turn'] % 2 == 0:
-            current_player = player_1
-            next_player = player_2
-        else:
-            current_player = player_2
-            next_player = player_1
+        # the same message is reused for every press on the board, so the press is read before anything is awaited
         presser_id = message.buttons_info.presser_user.id
         move_column = int(message.buttons_info.pressed_text) - 1
 
-        if not is_active or current_player.id != presser_id or board[0][move_column] is not None:
-            return
-        connect_4_data['is_active'] = False
-
-        i, j = self.insert_piece(move_column, current_player.number, board)
-        connect_4_data['turn'] += 1
-        if await self._check_game_finished(i, j, player_1, player_2, connect_4_data['turn'], board, message):
-            return
-
-        await self.edit(
-            Media(
-                connect_4_frontend.make_image(board, next_player, highlight=(i, j)),
-                MediaType.IMAGE,
-                'png',
-                Source.LOCAL
-            ),
-            message
-        )
-
-        if player_2.id == self.id:
-            connect_4_data['turn'] += 1
-            if await self._ai_turn(
-                player_1,
-                player_2,
-                next_player,
-                current_player,
-                connect_4_data['turn'],
-                constants.CONNECT_4_AI_DELAY_SECONDS,
-                board,
-                message
-            ):
-                return
+        await self.accept_button_event(message)
 
-        connect_4_data['is_active'] = True
+        game_key = (message.chat.id, message.id)
+        if game_key not in self._connect_4_games:
+            queue = asyncio.Queue()
+            self._connect_4_games[game_key] = (queue, asyncio.create_task(self._run_connect_4_game(game_key, queue)))
+        self._connect_4_games[game_key][0].put_nowait((message, presser_id, move_column))
 
     async def _on_connect_4_vs_itself(self, message: Message):
         if message.chat.is_group and not self.is_bot_mentioned(message):
             return
 
-        board = [[None for _ in range(constants.CONNECT_4_N_COLUMNS)] for _ in range(constants.CONNECT_4_N_ROWS)]
-
-        player_1 = Player(self.id, self.name.split('#')[0], 1)
-        player_2 = Player(self.id, self.name.split('#')[0], 2)
-        current_player = player_1
-        next_player = player_2
-        turn = 0
+        board = Connect4Board()
+        difficulty = self._get_connect_4_difficulty(message)
 
         bot_message = await self.send(
-            media=Media(connect_4_frontend.make_image(board, current_player), MediaType.IMAGE, 'png', Source.LOCAL),
+            media=Media(
+                await self._make_connect_4_image(board, Player(self.id, self.name.split('#')[0], 1)),
+                MediaType.IMAGE,
+                'png',
+                Source.LOCAL
+            ),
             message=message
         )
         await self.delete_message(message)
 
-        while True:
-            turn += 1
-            if await self._ai_turn(
-                player_1,
-                player_2,
-                current_player,
-                next_player,
-                turn,
-                constants.CONNECT_4_AI_DELAY_SECONDS / 2,
-                board,
-                bot_message
-            ):
-                break
-            current_player, next_player = next_player, current_player
+        # a new game against itself replaces the previous one of the chat
+        for game_key, (queue, game_task) in self._connect_4_games.items():
+            if game_key[0] == message.chat.id and queue is None:
+                game_task.cancel()
+
+        game_key = (message.chat.id, bot_message.id)
+        self._connect_4_games[game_key] = (
+            None,
+            asyncio.create_task(self._run_connect_4_vs_itself_game(game_key, board, difficulty, bot_message))
+        )
 
     # -------------------------------------------------------- #
     # -------------------- PUBLIC METHODS -------------------- #
     # -------------------------------------------------------- #
+    def cancel_connect_4_game(self, message: Message) -> None:
+        if game := self._connect_4_games.get((message.chat.id, message.id)):
+            game[1].cancel()
+
+    async def close_connect_4_executors(self) -> None:
+        for _, game_task in self._connect_4_games.values():
+            game_task.cancel()
+
+        self._connect_4_search_stop_flags[:] = [1] * len(self._connect_4_search_stop_flags)
+
+        await asyncio.gather(
+            asyncio.to_thread(self._connect_4_render_executor.shutdown, cancel_futures=True),
+            asyncio.to_thread(self._connect_4_search_executor.shutdown, cancel_futures=True)
+        )
+
     @staticmethod
-    def insert_piece(j: int, player_number: int, board: list[list[int | None]]) -> tuple[int, int] | None:
-        for i in range(constants.CONNECT_4_N_ROWS - 1, -1, -1):
-            if board[i][j] is None:
-                board[i][j] = player_number
-                return i, j
+    def insert_piece(j: int, player_number: int, board: Connect4Board) -> tuple[int, int] | None:
+        return board.insert(j, player_number)
@@ -109,7 +109,7 @@ class FlanaBot(
         return []
 
     async def _get_config_names(self, message: Message) -> list[str]:
-        config_names = ['auto_insult', 'auto_scraping', 'scraping_delete_original']
+        config_names = ['auto_insult', 'auto_scraping', 'btc_offers_collapsed', 'scraping_delete_original']
 
         if message.chat.is_private:
             config_names.append('ubereats')
@@ -346,6 +346,7 @@ class FlanaBot(
             if until and message.author.is_admin:
                 await self.clear(message.chat, until_message=message.replied_message)
             elif not until and (message.author.is_admin or message.replied_message.author.id in {self.id, message.author.id}):
+                self.cancel_connect_4_game(message.replied_message)
                 flanautils.do_later(flanautils.text_to_time(message.text).total_seconds(), self.delete_message, message.replied_message)
                 await self.delete_message(message)
             elif message.chat.is_group:
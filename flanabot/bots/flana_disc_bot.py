@@ -21,6 +21,7 @@ from flanabot import constants
 from flanabot.bots.flana_bot import FlanaBot
 from flanabot.models import Chat, Message, Punishment
 from flanabot.models.heating_context import ChannelData, HeatingContext
+from flanabot.models.scraping_text import ScrapingText
 from models.create_upload_response import CreateUploadResponse
 
 
@@ -161,9 +162,10 @@ class FlanaDiscBot(DiscordBot, FlanaBot):
         message: Message,
         force=False,
         audio_only=False,
-        timeout_for_media: int | float = constants.SCRAPING_TIMEOUT_SECONDS
+        timeout_for_media: int | float = constants.SCRAPING_TIMEOUT_SECONDS,
+        scraping_text: ScrapingText = None
     ) -> OrderedSet[Media]:
-        return await super()._search_medias(message, force, audio_only, timeout_for_media)
+        return await super()._search_medias(message, force, audio_only, timeout_for_media, scraping_text)
 
     async def _send_media(
         self,
@@ -15,6 +15,7 @@ from flanabot import constants
 from flanabot.bots.flana_bot import FlanaBot
 from flanabot.bots.lol_mythic_shop_bot import LolMythicShopBot
 from flanabot.models import Chat, Message
+from flanabot.models.scraping_text import ScrapingText
 
 
 # ---------------------------------------------------- #
@@ -138,9 +139,10 @@ class FlanaTeleBot(TelegramBot, LolMythicShopBot, FlanaBot):
         message: Message,
         force=False,
         audio_only=False,
-        timeout_for_media: int | float = constants.SCRAPING_TIMEOUT_SECONDS
+        timeout_for_media: int | float = constants.SCRAPING_TIMEOUT_SECONDS,
+        scraping_text: ScrapingText = None
     ) -> OrderedSet[Media]:
-        return await super()._search_medias(message, force, audio_only, timeout_for_media)
+        return await super()._search_medias(message, force, audio_only, timeout_for_media, scraping_text)
 
     async def _send_client_connections(self, client_connections: Iterable[dict[str, Any]]) -> None:
         for client_connection in client_connections:
@@ -13,6 +13,7 @@ from multibot import MultiBot, RegisteredCallback, SendError, constants as multi
 
 from flanabot import constants
 from flanabot.models import Action, BotAction, Message
+from flanabot.models.scraping_text import ScrapingText
 
 
 # ----------------------------------------------------------------------------------------------------- #
@@ -99,6 +100,31 @@ class ScraperBot(MultiBot, ABC):
         new_line = ' ' if len(medias_sended_info) == 1 else '\n'
         return f'{new_line}{medias_sended_info_joined}:'
 
+    async def _parse_scraping_text(self, text: str) -> ScrapingText:
+        scraping_text = ScrapingText()
+        words = text.split()
+        urls = flanautils.find_urls(text)
+
+        # platform ids are only found in words with a domain, each distinct one is searched once
+        candidate_words = list(dict.fromkeys(word for word in words if '.' in word))
+        words_ids = dict(zip(candidate_words, await asyncio.gather(*(self._find_ids(word) for word in candidate_words))))
+
+        for word in words:
+            if (word_ids := words_ids.get(word)) and any(word_ids):
+                tiktok_users_and_ids, tiktok_download_urls = word_ids
+                scraping_text.tiktok_users_and_ids |= tiktok_users_and_ids
+                scraping_text.tiktok_download_urls |= tiktok_download_urls
+            elif any(url in word for url in urls):
+                # links after a platform id are not scraped
+                if not scraping_text.has_ids:
+                    scraping_text.urls.append(word)
+                    if any(domain.lower() in word for domain in multibot_constants.GIF_DOMAINS):
+                        scraping_text.gif_urls.add(word)
+            else:
+                scraping_text.user_words.append(word)
+
+        return scraping_text
+
     async def _scrape_and_send(
         self,
         message: Message,
@@ -115,11 +141,18 @@ class ScraperBot(MultiBot, ABC):
             sended_media_messages = OrderedSet()
 
         kwargs = {'timeout_for_media': None} if full else {}
+        scraping_text = await self._parse_scraping_text(message.text)
 
-        if not (medias := await self._search_medias(message, force, audio_only, **kwargs)):
+        if not (medias := await self._search_medias(message, force, audio_only, scraping_text=scraping_text, **kwargs)):
             return OrderedSet()
 
-        new_sended_media_messages, _ = await self.send_medias(medias, message, send_user_context=send_user_context, keywords=keywords)
+        new_sended_media_messages, _ = await self.send_medias(
+            medias,
+            message,
+            send_user_context=send_user_context,
+            keywords=keywords,
+            scraping_text=scraping_text
+        )
         sended_media_messages |= new_sended_media_messages
 
         await self.send_inline_results(message)
@@ -155,7 +188,8 @@ class ScraperBot(MultiBot, ABC):
         message: Message,
         force=False,
         audio_only=False,
-        timeout_for_media: int | float = None
+        timeout_for_media: int | float = None,
+        scraping_text: ScrapingText = None
     ) -> OrderedSet[Media]:
         medias = OrderedSet()
         exceptions: list[Exception] = []
@@ -167,37 +201,18 @@ class ScraperBot(MultiBot, ABC):
             preferred_video_codec = 'h264'
             preferred_extension = 'mp4'
 
-        ids = []
-        media_urls = []
-        for text_part in message.text.split():
-            for i, platform_ids in enumerate(await self._find_ids(text_part)):
-                try:
-                    ids[i] |= platform_ids
-                except IndexError:
-                    ids.append(platform_ids)
+        if scraping_text is None:
+            scraping_text = await self._parse_scraping_text(message.text)
 
-            if (
-                not any(ids)
-                and
-                flanautils.find_urls(text_part)
-                and
-                (
-                    force
-                    or
-                    not any(domain.lower() in text_part for domain in multibot_constants.GIF_DOMAINS)
-                )
-            ):
-                media_urls.append(text_part)
+        media_urls = scraping_text.media_urls(force)
 
-        if not any(ids) and not media_urls:
+        if not scraping_text.has_ids and not media_urls:
             return medias
 
         bot_state_message = await self.send(random.choice(constants.SCRAPING_PHRASES), message)
 
-        tiktok_users_and_ids, tiktok_download_urls = ids
-
         gather_results = await asyncio.gather(
-            tiktok.get_medias(tiktok_users_and_ids, tiktok_download_urls, preferred_video_codec, preferred_extension, force, audio_only, timeout_for_media),
+            tiktok.get_medias(scraping_text.tiktok_users_and_ids, scraping_text.tiktok_download_urls, preferred_video_codec, preferred_extension, force, audio_only, timeout_for_media),
             yt_dlp_wrapper.get_medias(media_urls, preferred_video_codec, preferred_extension, force, audio_only, timeout_for_media),
             return_exceptions=True
         )
@@ -317,7 +332,8 @@ class ScraperBot(MultiBot, ABC):
         message: Message,
         send_song_info=False,
         send_user_context=True,
-        keywords: list[str] = None
+        keywords: list[str] = None,
+        scraping_text: ScrapingText = None
     ) -> tuple[list[Message], int]:
         if not keywords:
             keywords = []
@@ -334,16 +350,15 @@ class ScraperBot(MultiBot, ABC):
 
         if message.chat.is_group:
             sended_info_message = await self.send(f"{message.author.name.split('#')[0]} compartió{self._medias_sended_info(medias)}", message, reply_to=message.replied_message, data=message_data)
+            if send_user_context and scraping_text is None:
+                scraping_text = await self._parse_scraping_text(message.text)
+
             if (
                 send_user_context
                 and
                 (user_text := ' '.join(
-                    [word for word in message.text.split()
+                    [word for word in scraping_text.user_words
                      if (
-                         not any(await self._find_ids(word))
-                         and
-                         not flanautils.find_urls(word)
-                         and
                          not flanautils.cartesian_product_string_matching(word.lower(), keywords, multibot_constants.PARSER_MIN_SCORE_DEFAULT)
                          and
                          flanautils.remove_symbols(word).lower() not in (str(self.id), self.name.lower())
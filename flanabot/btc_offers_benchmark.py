@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from multibot import Platform
+
+from flanabot.bots.btc_offers_bot import BtcOffersBot
+from flanabot.btc_offers_fake_api import BtcOffersFakeApi
+
+DEFAULT_PORT = 8765
+
+
+@dataclass
+class BenchmarkChat:
+    id: int
+    btc_offers: dict[str, Any] = field(
+        default_factory=lambda: {'blocked_authors': [], 'blocked_descriptions': [], 'blocked_ids': [], 'query': {}}
+    )
+    config: dict[str, bool] = field(default_factory=lambda: {'btc_offers_collapsed': False})
+    is_group: bool = False
+
+    def pull_from_database(self, *args, **kwargs):
+        pass
+
+    def save(self, *args, **kwargs):
+        pass
+
+
+@dataclass
+class BenchmarkMessage:
+    text: str
+    chat: BenchmarkChat
+    is_command: bool = True
+
+
+class BenchmarkBtcOffersBot(BtcOffersBot):
+    # platform that only waits send_latency per sent message, without database
+    def __init__(self, chats: list[BenchmarkChat], send_latency: float):
+        super().__init__(token='', client=None)
+        self.platform = Platform.TELEGRAM
+        self.chats = {chat.id: chat for chat in chats}
+        self.send_latency = send_latency
+        self.n_sent_messages = 0
+        self.notification_latencies = []
+        self.notified_at = []
+
+    def _find_chats_to_notify(self) -> list[BenchmarkChat]:
+        return [chat for chat in self.chats.values() if chat.btc_offers['query']]
+
+    async def _notify_btc_offers(self, chat: BenchmarkChat, data: dict) -> None:
+        await super()._notify_btc_offers(chat, data)
+
+        self.notified_at.append(time.perf_counter())
+        self.notification_latencies.append(time.time() - data['sent_at'])
+
+        # the real api forgets the query, the fake one keeps notifying the chat
+        self.chats[data['chat_id']].btc_offers['query'] = {'max_price_eur': 0}
+
+    async def delete_message(self, *args, **kwargs):
+        await asyncio.sleep(self.send_latency)
+
+    async def edit(self, *args, **kwargs):
+        await asyncio.sleep(self.send_latency)
+
+    async def get_chat(self, chat: int) -> BenchmarkChat:
+        return self.chats[chat]
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        self.n_sent_messages += 1
+
+    async def send_error(self, *args, **kwargs):
+        await self.send(*args, **kwargs)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+async def _benchmark_offers(
+    bot: BenchmarkBtcOffersBot,
+    n_requests: int,
+    concurrency: int,
+    n_distinct_queries: int,
+    collapsed: bool
+) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    chat = BenchmarkChat(0, config={'btc_offers_collapsed': collapsed})
+    latencies = []
+
+    async def request(request_number: int):
+        # the fake api prices go from 50000 to 100000 €, so every query has matching offers
+        message = BenchmarkMessage(
+            f'ofertas por {60000 + request_number % n_distinct_queries * 100} euros con bizum',
+            chat
+        )
+        async with semaphore:
+            started_at = time.perf_counter()
+            await bot._on_btc_offers(message)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(request(request_number) for request_number in range(n_requests)))
+
+    return latencies, time.perf_counter() - started_at
+
+
+async def _benchmark_notifications(bot: BenchmarkBtcOffersBot, n_notifications: int) -> tuple[list[float], float]:
+    for chat in bot.chats.values():
+        chat.btc_offers['query'] = {'max_price_eur': 0}
+
+    started_at = time.perf_counter()
+    await bot.start_all_btc_offers_notifications()
+    while len(bot.notification_latencies) < n_notifications:
+        await asyncio.sleep(0.01)
+
+    for chat in bot.chats.values():
+        chat.btc_offers['query'] = {}
+    await bot._cancel_btc_offers_notifications_task()
+
+    return bot.notification_latencies, max(bot.notified_at) - started_at
+
+
+async def run(
+    n_requests: int = 200,
+    concurrency: int = 10,
+    n_distinct_queries: int = 50,
+    n_chats: int = 100,
+    n_notifications: int = 1000,
+    notification_rate: float = 0,
+    send_latency: float = 0.005,
+    api_latency: float = 0.02,
+    n_offers: int = 500,
+    collapsed: bool = False,
+    port: int = DEFAULT_PORT
+) -> tuple[tuple[list[float], float], tuple[list[float], float], int]:
+    random.seed(0)
+    os.environ['BTC_OFFERS_API_HOST'] = 'localhost'
+    os.environ['BTC_OFFERS_API_PORT'] = str(port)
+
+    fake_api = BtcOffersFakeApi(api_latency, notification_rate, n_notifications, n_offers)
+    runner = await fake_api.start('localhost', port)
+    bot = BenchmarkBtcOffersBot(
+        [BenchmarkChat(chat_id, config={'btc_offers_collapsed': collapsed}) for chat_id in range(n_chats)],
+        send_latency
+    )
+    bot._open_btc_offers_session()
+
+    try:
+        offers_results = await _benchmark_offers(bot, n_requests, concurrency, n_distinct_queries, collapsed)
+        notifications_results = await _benchmark_notifications(bot, n_notifications)
+    finally:
+        if bot._btc_offers_websocket:
+            await bot._btc_offers_websocket.close()
+        await bot.close_btc_offers_session()
+        await runner.cleanup()
+
+    return offers_results, notifications_results, fake_api.n_requests
+
+
+def print_report(
+    offers_results: tuple[list[float], float],
+    notifications_results: tuple[list[float], float],
+    n_api_requests: int
+):
+    offers_latencies, offers_elapsed = offers_results
+    print(
+        f'/offers: {len(offers_latencies)} requests in {offers_elapsed:.2f} s'
+        f' ({len(offers_latencies) / offers_elapsed:.1f} requests/s, {n_api_requests} reached the api)'
+    )
+    print(
+        f'    p50 {1000 * _percentile(offers_latencies, 50):.1f} ms'
+        f'    p99 {1000 * _percentile(offers_latencies, 99):.1f} ms'
+    )
+    print()
+
+    notification_latencies, notifications_elapsed = notifications_results
+    print(
+        f'notifications: {len(notification_latencies)} in {notifications_elapsed:.2f} s'
+        f' ({len(notification_latencies) / notifications_elapsed:.1f} notifications/s)'
+    )
+    print(
+        f'    p50 {1000 * _percentile(notification_latencies, 50):.1f} ms'
+        f'    p99 {1000 * _percentile(notification_latencies, 99):.1f} ms'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive the BTC offers handlers against a local fake API and report their latency and throughput.')
+    parser.add_argument('--requests', type=int, default=200, help='/offers requests')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent /offers requests')
+    parser.add_argument('--distinct-queries', type=int, default=50)
+    parser.add_argument('--chats', type=int, default=100, help='chats subscribed to notifications')
+    parser.add_argument('--notifications', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=0, help='notifications per second, 0 for as fast as possible')
+    parser.add_argument('--send-latency', type=float, default=0.005, help='seconds per message sent to the platform')
+    parser.add_argument('--api-latency', type=float, default=0.02, help='seconds added to every /offers response')
+    parser.add_argument('--offers', type=int, default=500, help='offers in the fake api book')
+    parser.add_argument('--collapsed', action='store_true', help='send the offers as collapsed lists')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    print_report(
+        *asyncio.run(
+            run(
+                args.requests,
+                args.concurrency,
+                args.distinct_queries,
+                args.chats,
+                args.notifications,
+                args.rate,
+                args.send_latency,
+                args.api_latency,
+                args.offers,
+                args.collapsed,
+                args.port
+            )
+        )
+    )
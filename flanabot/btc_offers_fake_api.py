@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import random
+import time
+import urllib.parse
+from typing import Any
+
+from aiohttp import WSMsgType, web
+from multidict import MultiMapping
+
+from flanabot.models import Exchange, PaymentMethod
+
+DEFAULT_PORT = 8000
+DESCRIPTIONS = ('', 'Solo Bizum.', 'No KYC', 'Pago rápido', 'Sin verificación, solo SEPA')
+MAX_NOTIFICATION_OFFERS = 10
+
+
+class BtcOffersFakeApi:
+    def __init__(
+        self,
+        api_latency: float = 0,
+        notification_rate: float = 0,
+        n_notifications: int | None = None,
+        n_offers: int = 500
+    ):
+        self.api_latency = api_latency
+        self.notification_rate = notification_rate
+        self.n_notifications = n_notifications
+        self.n_requests = 0
+        # the whole book, sorted by price as the api returns it
+        self.offers = sorted(self._make_dated_offers(n_offers, 0)['offers'], key=lambda offer: offer['price_eur'])
+        self.subscriptions: dict[int, dict] = {}
+        self._subscribed = asyncio.Event()
+
+    def _make_dated_offers(self, n_offers: int, seed: int) -> dict:
+        randomizer = random.Random(seed)
+        offers = []
+        for i in range(n_offers):
+            price_eur = randomizer.uniform(50000, 100000)
+            offers.append(
+                {
+                    'exchange': randomizer.choice(list(Exchange)).value,
+                    'id': f'{seed}-{i}',
+                    'payment_methods': [
+                        payment_method.value for payment_method in randomizer.sample(list(PaymentMethod), k=2)
+                    ],
+                    'fiat_amount': f'{randomizer.randint(50, 500)}-{randomizer.randint(500, 5000)}',
+                    'price_eur': price_eur,
+                    'price_usd': price_eur * 1.08,
+                    'premium': randomizer.uniform(-2, 10),
+                    'author': f'author_{randomizer.randint(0, 1000)}',
+                    'trades': randomizer.randint(0, 5000),
+                    'rating': randomizer.random(),
+                    'url': f'https://example.com/offers/{seed}-{i}',
+                    'description': f"{randomizer.choice(DESCRIPTIONS)} {'Synthetic offer ' * randomizer.randint(0, 10)}".strip()
+                }
+            )
+
+        return {'offers': offers, 'updated_at': datetime.datetime.now(datetime.UTC).isoformat()}
+
+    async def _on_offers(self, request: web.Request) -> web.Response:
+        self.n_requests += 1
+        await asyncio.sleep(self.api_latency)
+
+        return web.json_response(
+            {'offers': self.filter_offers(request.query), 'updated_at': datetime.datetime.now(datetime.UTC).isoformat()}
+        )
+
+    async def _on_notifications(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        push_task = asyncio.create_task(self._push_notifications(websocket))
+
+        try:
+            async for websocket_message in websocket:
+                if websocket_message.type is not WSMsgType.TEXT:
+                    continue
+
+                match json.loads(websocket_message.data):
+                    case {'action': 'start', 'chat_id': chat_id, 'query': query}:
+                        self.subscriptions[chat_id] = query
+                        self._subscribed.set()
+                    case {'action': 'stop', 'chat_id': chat_id}:
+                        self.subscriptions.pop(chat_id, None)
+        finally:
+            push_task.cancel()
+
+        return websocket
+
+    async def _push_notifications(self, websocket: web.WebSocketResponse) -> None:
+        # the real api notifies a chat once and forgets its query, here the chats are notified round robin so the
+        # notification rate is sustained
+        await self._subscribed.wait()
+
+        if self.n_notifications is None:
+            notification_numbers = itertools.count()
+        else:
+            notification_numbers = range(self.n_notifications)
+
+        started_at = time.perf_counter()
+        for notification_number in notification_numbers:
+            if self.notification_rate:
+                await asyncio.sleep(max(0.0, started_at + notification_number / self.notification_rate - time.perf_counter()))
+
+            if not self.subscriptions:
+                break
+
+            chat_ids = list(self.subscriptions)
+            await websocket.send_json(
+                {
+                    'chat_id': chat_ids[notification_number % len(chat_ids)],
+                    'dated_offers': self._make_dated_offers(
+                        random.randint(1, MAX_NOTIFICATION_OFFERS),
+                        notification_number
+                    ),
+                    'sent_at': time.time()
+                }
+            )
+
+    def filter_offers(self, query: MultiMapping[str]) -> list[dict[str, Any]]:
+        # server side filtering, as described in btc_offers_filter
+        limit = int(float(query.get('limit', len(self.offers))))
+        exchanges = set(query.getall('exchanges', ()))
+        payment_methods = set(query.getall('payment_methods', ()))
+        max_prices = {
+            field: float(query[parameter])
+            for parameter, field in (('max_price_eur', 'price_eur'), ('max_price_usd', 'price_usd'), ('max_premium', 'premium'))
+            if parameter in query
+        }
+        ignore_ids = {urllib.parse.unquote(id) for id in query.getall('ignore_ids', ())}
+        ignore_authors = {urllib.parse.unquote(author) for author in query.getall('ignore_authors', ())}
+        ignore_descriptions = [
+            urllib.parse.unquote(description).lower() for description in query.getall('ignore_descriptions', ())
+        ]
+
+        offers = []
+        for offer in self.offers:
+            if len(offers) >= limit:
+                break
+
+            if (
+                (exchanges and offer['exchange'] not in exchanges)
+                or
+                (payment_methods and not payment_methods.intersection(offer['payment_methods']))
+                or
+                any(offer[field] > max_price for field, max_price in max_prices.items())
+                or
+                offer['id'] in ignore_ids
+                or
+                offer['author'] in ignore_authors
+                or
+                any(description in (offer['description'] or '').lower() for description in ignore_descriptions)
+            ):
+                continue
+
+            offers.append(offer)
+
+        return offers
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/offers', self._on_offers)
+        app.router.add_get('/ws/offers/notifications', self._on_notifications)
+
+        return app
+
+    async def start(self, host: str = 'localhost', port: int = DEFAULT_PORT) -> web.AppRunner:
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+
+        return runner
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve synthetic BTC offers and notifications in place of the BTC offers API.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--api-latency', type=float, default=0, help='seconds added to every /offers response')
+    parser.add_argument('--rate', type=float, default=1, help='notifications per second, 0 for as fast as possible')
+    parser.add_argument('--offers', type=int, default=500, help='offers in the book')
+    args = parser.parse_args()
+
+    web.run_app(
+        BtcOffersFakeApi(args.api_latency, args.rate, n_offers=args.offers).make_app(),
+        host=args.host,
+        port=args.port
+    )
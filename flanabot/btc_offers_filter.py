@@ -0,0 +1,81 @@
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any, Self
+
+# Filters a list of offers keeping its order:
+#   - exchanges and payment_methods: an offer matches if it has any of the given ones.
+#   - max_price_eur, max_price_usd and max_premium: inclusive upper bounds.
+#   - ignore_ids and ignore_authors: exact matches.
+#   - ignore_descriptions: case-insensitive substrings of the offer description.
+#   - limit: at most limit offers, the first ones that match.
+
+
+@dataclass(frozen=True)
+class BtcOffersFilter:
+    limit: int | None = None
+    exchanges: frozenset[str] = frozenset()
+    payment_methods: frozenset[str] = frozenset()
+    max_price_eur: float | None = None
+    max_price_usd: float | None = None
+    max_premium: float | None = None
+    ignore_ids: frozenset[str] = frozenset()
+    ignore_authors: frozenset[str] = frozenset()
+    ignore_descriptions: re.Pattern | None = None
+
+    @classmethod
+    def from_query(cls, query: dict[str, Any]) -> Self:
+        if ignore_descriptions := query.get('ignore_descriptions'):
+            # a single alternation, longest first, so each description is scanned once for every blocked text
+            ignore_descriptions_pattern = re.compile(
+                '|'.join(re.escape(description) for description in sorted(ignore_descriptions, key=len, reverse=True)),
+                re.IGNORECASE
+            )
+        else:
+            ignore_descriptions_pattern = None
+
+        return cls(
+            limit=query.get('limit'),
+            exchanges=frozenset(query.get('exchanges', ())),
+            payment_methods=frozenset(query.get('payment_methods', ())),
+            max_price_eur=query.get('max_price_eur'),
+            max_price_usd=query.get('max_price_usd'),
+            max_premium=query.get('max_premium'),
+            ignore_ids=frozenset(query.get('ignore_ids', ())),
+            ignore_authors=frozenset(query.get('ignore_authors', ())),
+            ignore_descriptions=ignore_descriptions_pattern
+        )
+
+    def apply(self, offers: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        filtered_offers = []
+
+        if self.limit is not None and self.limit <= 0:
+            return filtered_offers
+
+        for offer in offers:
+            if self.matches(offer):
+                filtered_offers.append(offer)
+
+                if self.limit is not None and len(filtered_offers) >= self.limit:
+                    break
+
+        return filtered_offers
+
+    def matches(self, offer: dict[str, Any]) -> bool:
+        return (
+            (not self.exchanges or offer['exchange'] in self.exchanges)
+            and
+            (not self.payment_methods or not self.payment_methods.isdisjoint(offer['payment_methods']))
+            and
+            (self.max_price_eur is None or offer['price_eur'] <= self.max_price_eur)
+            and
+            (self.max_price_usd is None or offer['price_usd'] <= self.max_price_usd)
+            and
+            (self.max_premium is None or offer['premium'] <= self.max_premium)
+            and
+            offer['id'] not in self.ignore_ids
+            and
+            offer['author'] not in self.ignore_authors
+            and
+            not (self.ignore_descriptions and offer['description'] and self.ignore_descriptions.search(offer['description']))
+        )
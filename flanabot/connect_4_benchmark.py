@@ -0,0 +1,218 @@
+import argparse
+import functools
+import itertools
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from flanabot import connect_4_frontend, connect_4_solver, constants
+from flanabot.bots.connect_4_bot import Connect4Bot
+from flanabot.connect_4_engine import Connect4Board
+from flanabot.connect_4_opening_book import Connect4OpeningBook
+from flanabot.models import Connect4Difficulty, Player
+
+DEFAULT_TIME_BUDGET = 0.05
+PNG_ENCODERS = {'argb32': connect_4_frontend.encode_png, 'palette': connect_4_frontend.encode_palette_png}
+
+
+@dataclass
+class GameResult:
+    difficulties: tuple[Connect4Difficulty, Connect4Difficulty]
+    winner: int | None = None
+    n_moves: int = 0
+    think_times: list[float] = field(default_factory=lambda: [0, 0])
+    render_times: list[float] = field(default_factory=list)
+    render_cache_hits: int = 0
+    encodings: dict[str, list[tuple[float, int]]] = field(default_factory=lambda: {name: [] for name in PNG_ENCODERS})
+
+
+@dataclass
+class MatchupStats:
+    n_games: int = 0
+    n_moves: int = 0
+    wins: list[int] = field(default_factory=lambda: [0, 0])
+    draws: int = 0
+    think_times: list[float] = field(default_factory=lambda: [0, 0])
+    n_moves_by_player: list[int] = field(default_factory=lambda: [0, 0])
+
+    def add(self, game_result: GameResult):
+        self.n_games += 1
+        self.n_moves += game_result.n_moves
+        if game_result.winner is None:
+            self.draws += 1
+        else:
+            self.wins[game_result.winner - 1] += 1
+
+        for index in range(2):
+            self.think_times[index] += game_result.think_times[index]
+            self.n_moves_by_player[index] += (game_result.n_moves + 1 - index) // 2
+
+
+@functools.cache
+def _opening_book() -> Connect4OpeningBook:
+    return Connect4OpeningBook()
+
+
+def _ai_insert(player_number: int, board: Connect4Board, difficulty: Connect4Difficulty, time_budget: float) -> tuple[int, int]:
+    # same decisions as Connect4Bot._ai_turn, but searching in the current process
+    if difficulty is not Connect4Difficulty.EASY:
+        if (j := _opening_book().best_move(board)) is None:
+            j = connect_4_solver.search_best_move(
+                board.to_rows(),
+                player_number,
+                constants.CONNECT_4_SEARCH_DEPTHS[difficulty],
+                time_budget
+            )
+        if j is not None:
+            return board.insert(j, player_number)
+
+    return Connect4Bot._ai_insert(player_number, 3 - player_number, board)
+
+
+def _play_game(
+    difficulties: tuple[Connect4Difficulty, Connect4Difficulty],
+    seed: int,
+    time_budget: float,
+    render: bool
+) -> GameResult:
+    random.seed(seed)
+    board = Connect4Board()
+    players = [Player(0, difficulty.name.lower(), player_number) for player_number, difficulty in enumerate(difficulties, start=1)]
+    game_result = GameResult(difficulties)
+
+    def render_image(*args, **kwargs):
+        # the bot goes through the render cache, the hits are counted apart from the render time
+        render_cache_hits = connect_4_frontend.render_cache.hits
+        connect_4_frontend.make_image(board, *args, **kwargs)
+        game_result.render_cache_hits += connect_4_frontend.render_cache.hits - render_cache_hits
+
+        started_at = time.perf_counter()
+        connect_4_frontend.render_image(board, *args, **kwargs)
+        game_result.render_times.append(time.perf_counter() - started_at)
+
+        surface = connect_4_frontend.draw_image(board, *args, **kwargs)
+        for name, encode in PNG_ENCODERS.items():
+            started_at = time.perf_counter()
+            image_bytes = encode(surface)
+            game_result.encodings[name].append((time.perf_counter() - started_at, len(image_bytes)))
+
+    while True:
+        player_number = board.n_moves % 2 + 1
+        started_at = time.perf_counter()
+        i, j = _ai_insert(player_number, board, difficulties[player_number - 1], time_budget)
+        game_result.think_times[player_number - 1] += time.perf_counter() - started_at
+        game_result.n_moves += 1
+
+        if player_number in board.winners(i, j):
+            game_result.winner = player_number
+            if render:
+                render_image(highlight=(i, j), winner=players[player_number - 1], loser=players[2 - player_number], win_position=(i, j))
+            break
+        if board.is_full():
+            if render:
+                render_image(highlight=(i, j), tie=True)
+            break
+        if render:
+            render_image(players[2 - player_number], highlight=(i, j))
+
+    return game_result
+
+
+def run(
+    difficulties: list[Connect4Difficulty],
+    n_games: int,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    render: bool = True,
+    max_workers: int = None
+) -> tuple[
+    dict[tuple[Connect4Difficulty, Connect4Difficulty], MatchupStats],
+    list[float],
+    int,
+    dict[str, list[tuple[float, int]]],
+    float
+]:
+    matchups = list(itertools.product(difficulties, repeat=2))
+    games = [(matchup, seed) for matchup in matchups for seed in range(n_games)]
+    stats = {matchup: MatchupStats() for matchup in matchups}
+    render_times = []
+    render_cache_hits = 0
+    encodings = {name: [] for name in PNG_ENCODERS}
+
+    started_at = time.perf_counter()
+    with ProcessPoolExecutor(max_workers) as executor:
+        for game_result in executor.map(
+            _play_game,
+            (matchup for matchup, _ in games),
+            (seed for _, seed in games),
+            (time_budget for _ in games),
+            (render for _ in games),
+            chunksize=8
+        ):
+            stats[game_result.difficulties].add(game_result)
+            render_times.extend(game_result.render_times)
+            render_cache_hits += game_result.render_cache_hits
+            for name, encoder_encodings in game_result.encodings.items():
+                encodings[name].extend(encoder_encodings)
+
+    return stats, render_times, render_cache_hits, encodings, time.perf_counter() - started_at
+
+
+def print_report(
+    stats: dict[tuple[Connect4Difficulty, Connect4Difficulty], MatchupStats],
+    render_times: list[float],
+    render_cache_hits: int,
+    encodings: dict[str, list[tuple[float, int]]],
+    elapsed: float
+):
+    n_games = sum(matchup_stats.n_games for matchup_stats in stats.values())
+    n_moves = sum(matchup_stats.n_moves for matchup_stats in stats.values())
+    print(f'{n_games} games, {n_moves} moves in {elapsed:.2f} s ({n_moves / elapsed:.1f} moves/s)')
+    print()
+
+    print(f'{'player 1':>8} {'player 2':>8} {'p1 wins':>8} {'p2 wins':>8} {'draws':>8} {'p1 ms/ply':>10} {'p2 ms/ply':>10}')
+    for (player_1_difficulty, player_2_difficulty), matchup_stats in stats.items():
+        think_times_per_ply = [
+            1000 * think_time / n_player_moves if n_player_moves else 0
+            for think_time, n_player_moves in zip(matchup_stats.think_times, matchup_stats.n_moves_by_player)
+        ]
+        print(
+            f'{player_1_difficulty.name.lower():>8} {player_2_difficulty.name.lower():>8}'
+            f' {matchup_stats.wins[0] / matchup_stats.n_games:>8.1%}'
+            f' {matchup_stats.wins[1] / matchup_stats.n_games:>8.1%}'
+            f' {matchup_stats.draws / matchup_stats.n_games:>8.1%}'
+            f' {think_times_per_ply[0]:>10.2f} {think_times_per_ply[1]:>10.2f}'
+        )
+
+    if render_times:
+        print()
+        print(f'render_image: {len(render_times)} calls, {1000 * sum(render_times) / len(render_times):.2f} ms/call')
+        print(f'make_image render cache: {render_cache_hits / len(render_times):.1%} hits')
+
+        print()
+        print(f'{'png':>8} {'bytes/image':>12} {'ms/image':>10}')
+        for name, encoder_encodings in encodings.items():
+            encode_times, sizes = zip(*encoder_encodings)
+            print(f'{name:>8} {sum(sizes) / len(sizes):>12.0f} {1000 * sum(encode_times) / len(encode_times):>10.2f}')
+
+
+if __name__ == '__main__':
+    difficulty_names = [difficulty.name.lower() for difficulty in Connect4Difficulty]
+
+    parser = argparse.ArgumentParser(description='Play connect 4 AI games against each other and report the engine and renderer speed.')
+    parser.add_argument('--games', type=int, default=100, help='games per matchup')
+    parser.add_argument('--difficulties', nargs='+', choices=difficulty_names, default=difficulty_names)
+    parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET, help='search seconds per move')
+    parser.add_argument('--no-render', action='store_true')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    print_report(
+        *run(
+            [Connect4Difficulty[name.upper()] for name in args.difficulties],
+            args.games,
+            args.time_budget,
+            not args.no_render,
+            args.workers
+        )
+    )
@@ -0,0 +1,246 @@
+import functools
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Self, Sequence
+
+from flanabot import constants
+
+
+@dataclass(frozen=True)
+class WinningLines:
+    lines: tuple[tuple[tuple[int, int], ...], ...]
+    masks: tuple[int, ...]
+    cell_lines: tuple[tuple[tuple[int, ...], ...], ...]
+    bit_masks: tuple[tuple[int, ...], ...]
+
+
+@functools.cache
+def winning_lines(n_rows: int, n_columns: int) -> WinningLines:
+    lines = []
+    for i in range(n_rows):
+        for j in range(n_columns):
+            for i_step, j_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                i_end = i + 3 * i_step
+                j_end = j + 3 * j_step
+                if 0 <= i_end < n_rows and 0 <= j_end < n_columns:
+                    lines.append(tuple((i + n * i_step, j + n * j_step) for n in range(4)))
+
+    cell_lines = [[[] for _ in range(n_columns)] for _ in range(n_rows)]
+    for line_index, line in enumerate(lines):
+        for i, j in line:
+            cell_lines[i][j].append(line_index)
+
+    masks = tuple(sum(1 << (j * (n_rows + 1) + n_rows - 1 - i) for i, j in line) for line in lines)
+
+    # masks of the lines through every cell, indexed by the cell bit index (bits of the sentinel row are left empty)
+    bit_masks = [() for _ in range(n_columns * (n_rows + 1))]
+    for i, row in enumerate(cell_lines):
+        for j, line_indices in enumerate(row):
+            bit_masks[j * (n_rows + 1) + n_rows - 1 - i] = tuple(masks[line_index] for line_index in line_indices)
+
+    return WinningLines(
+        lines=tuple(lines),
+        masks=masks,
+        cell_lines=tuple(tuple(tuple(line_indices) for line_indices in row) for row in cell_lines),
+        bit_masks=tuple(bit_masks)
+    )
+
+
+@functools.cache
+def _zobrist_keys(n_bits: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    random_ = random.Random(n_bits)
+
+    return tuple(tuple(random_.getrandbits(64) for _ in range(n_bits)) for _ in range(2))
+
+
+# Every column uses n_rows + 1 bits (bottom to top) so that the extra top bit is always empty and separates the
+# columns. This makes shifting by 1 (vertical), n_rows + 1 (horizontal), n_rows (diagonal /) and n_rows + 2
+# (diagonal \) never connect pieces of different lines.
+@dataclass
+class Connect4Board:
+    n_rows: int = constants.CONNECT_4_N_ROWS
+    n_columns: int = constants.CONNECT_4_N_COLUMNS
+    bitboards: list[int] = field(default_factory=lambda: [0, 0])
+    heights: list[int] = None
+
+    def __post_init__(self):
+        if self.heights is None:
+            self.heights = [0] * self.n_columns
+
+        self._column_height = self.n_rows + 1
+        self._shifts = (1, self._column_height, self.n_rows, self._column_height + 1)
+        self._bottom_mask = sum(1 << (j * self._column_height) for j in range(self.n_columns))
+        self._board_mask = self._bottom_mask * ((1 << self.n_rows) - 1)
+        self.winning_lines = winning_lines(self.n_rows, self.n_columns)
+        self._zobrist_keys = _zobrist_keys(self.n_columns * self._column_height)
+        self.n_moves = sum(self.heights)
+        self.zobrist_key = 0
+        # cells that complete a line of each player, occupied ones included, kept up to date on every insert
+        self._threats = [self._bitboard_threats(bitboard) for bitboard in self.bitboards]
+        self._threats_history: list[tuple[int, int, int]] = []
+
+        for player_index, bitboard in enumerate(self.bitboards):
+            while bitboard:
+                bit = bitboard & -bitboard
+                self.zobrist_key ^= self._zobrist_keys[player_index][bit.bit_length() - 1]
+                bitboard ^= bit
+
+    def __getitem__(self, position: tuple[int, int]) -> int | None:
+        cell_mask = self.cell_mask(*position)
+
+        if self.bitboards[0] & cell_mask:
+            return 1
+        if self.bitboards[1] & cell_mask:
+            return 2
+
+    @property
+    def mask(self) -> int:
+        return self.bitboards[0] | self.bitboards[1]
+
+    def _bitboard_threats(self, bitboard: int) -> int:
+        threats = 0
+
+        for shift in self._shifts:
+            pairs = (bitboard << shift) & (bitboard << 2 * shift)
+            threats |= pairs & (bitboard << 3 * shift)
+            threats |= pairs & (bitboard >> shift)
+
+            pairs = (bitboard >> shift) & (bitboard >> 2 * shift)
+            threats |= pairs & (bitboard << shift)
+            threats |= pairs & (bitboard >> 3 * shift)
+
+        return threats & (self._board_mask ^ self.mask)
+
+    def available_positions(self) -> list[tuple[int, int]]:
+        return [(self.n_rows - 1 - height, j) for j, height in enumerate(self.heights) if height < self.n_rows]
+
+    def cell_mask(self, i: int, j: int) -> int:
+        return 1 << (j * self._column_height + self.n_rows - 1 - i)
+
+    def column_mask(self, j: int) -> int:
+        return ((1 << self.n_rows) - 1) << (j * self._column_height)
+
+    def copy(self) -> Self:
+        return self.__class__(self.n_rows, self.n_columns, self.bitboards.copy(), self.heights.copy())
+
+    @classmethod
+    def from_bitboards(
+        cls,
+        bitboards: Sequence[int],
+        n_rows: int = constants.CONNECT_4_N_ROWS,
+        n_columns: int = constants.CONNECT_4_N_COLUMNS
+    ) -> Self:
+        mask = bitboards[0] | bitboards[1]
+        column_bits = (1 << n_rows) - 1
+        heights = [(mask >> (j * (n_rows + 1)) & column_bits).bit_count() for j in range(n_columns)]
+
+        return cls(n_rows, n_columns, list(bitboards), heights)
+
+    @classmethod
+    def from_rows(cls, rows: list[list[int | None]]) -> Self:
+        board = cls(len(rows), len(rows[0]))
+
+        for i in range(board.n_rows - 1, -1, -1):
+            for j, player_number in enumerate(rows[i]):
+                if player_number is not None:
+                    board.insert(j, player_number)
+
+        return board
+
+    def insert(self, j: int, player_number: int) -> tuple[int, int] | None:
+        if not self.is_playable(j):
+            return
+
+        bit_index = j * self._column_height + self.heights[j]
+        self.bitboards[player_number - 1] |= 1 << bit_index
+        self.zobrist_key ^= self._zobrist_keys[player_number - 1][bit_index]
+        self.heights[j] += 1
+        self.n_moves += 1
+
+        # only the lines through the new piece can get a new threat
+        self._threats_history.append((j, *self._threats))
+        bitboard = self.bitboards[player_number - 1]
+        threats = self._threats[player_number - 1]
+        for line_mask in self.winning_lines.bit_masks[bit_index]:
+            if (line_pieces := bitboard & line_mask).bit_count() == 3:
+                threats |= line_mask ^ line_pieces
+        self._threats[player_number - 1] = threats
+
+        return self.n_rows - self.heights[j], j
+
+    def is_full(self) -> bool:
+        return self.n_moves == self.n_rows * self.n_columns
+
+    def is_playable(self, j: int) -> bool:
+        return self.heights[j] < self.n_rows
+
+    def key(self) -> int:
+        # adding the bottom mask puts a marker bit over the pieces of every column, so the key is unique
+        return self.bitboards[0] + self.mask + self._bottom_mask
+
+    def mirrored_key(self) -> int:
+        key = self.key()
+        column_mask = (1 << self._column_height) - 1
+        mirrored_key = 0
+
+        for j in range(self.n_columns):
+            mirrored_key |= ((key >> (j * self._column_height)) & column_mask) << ((self.n_columns - 1 - j) * self._column_height)
+
+        return mirrored_key
+
+    def n_winning_positions(self, player_number: int) -> int:
+        return (self.threats(player_number) & self.playable_mask()).bit_count()
+
+    def playable_mask(self) -> int:
+        return (self.mask + self._bottom_mask) & self._board_mask
+
+    def remove(self, j: int) -> tuple[int, int] | None:
+        if not self.heights[j]:
+            return
+
+        self.heights[j] -= 1
+        self.n_moves -= 1
+        bit_index = j * self._column_height + self.heights[j]
+        player_index = 0 if self.bitboards[0] >> bit_index & 1 else 1
+        self.bitboards[player_index] ^= 1 << bit_index
+        self.zobrist_key ^= self._zobrist_keys[player_index][bit_index]
+
+        if self._threats_history and self._threats_history[-1][0] == j:
+            _, *self._threats = self._threats_history.pop()
+        else:
+            # not undoing the last insert, so the saved threats no longer apply
+            self._threats_history.clear()
+            self._threats = [self._bitboard_threats(bitboard) for bitboard in self.bitboards]
+
+        return self.n_rows - 1 - self.heights[j], j
+
+    def threats(self, player_number: int) -> int:
+        return self._threats[player_number - 1] & (self._board_mask ^ self.mask)
+
+    def to_rows(self) -> list[list[int | None]]:
+        return [[self[i, j] for j in range(self.n_columns)] for i in range(self.n_rows)]
+
+    def winners(self, i: int, j: int) -> set[int]:
+        cell_mask = self.cell_mask(i, j)
+        line_masks = [self.winning_lines.masks[line_index] for line_index in self.winning_lines.cell_lines[i][j]]
+
+        return {
+            player_number
+            for player_number, bitboard in enumerate(self.bitboards, start=1)
+            if any((bitboard | cell_mask) & line_mask == line_mask for line_mask in line_masks)
+        }
+
+    def winning_positions(self) -> defaultdict[int, list[tuple[int, int]]]:
+        winning_positions: defaultdict[int, list[tuple[int, int]]] = defaultdict(list)
+        playable_mask = self.playable_mask()
+
+        for player_number in (1, 2):
+            if not (threats := self.threats(player_number) & playable_mask):
+                continue
+
+            for i, j in self.available_positions():
+                if threats & self.cell_mask(i, j):
+                    winning_positions[player_number].append((i, j))
+
+        return winning_positions
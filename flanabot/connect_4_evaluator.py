@@ -0,0 +1,54 @@
+from typing import Sequence
+
+import numpy
+
+from flanabot import constants
+from flanabot.connect_4_engine import Connect4Board, winning_lines
+
+
+class Connect4Evaluator:
+    def __init__(self, n_rows: int = constants.CONNECT_4_N_ROWS, n_columns: int = constants.CONNECT_4_N_COLUMNS):
+        self.n_rows = n_rows
+        self.n_columns = n_columns
+
+        # cells are flattened row by row: cell index = i * n_columns + j
+        lines = winning_lines(n_rows, n_columns).lines
+        self.line_cells = numpy.zeros((len(lines), n_rows * n_columns), numpy.int32)
+        for line_index, line in enumerate(lines):
+            for i, j in line:
+                self.line_cells[line_index, i * n_columns + j] = 1
+
+        rows, columns = numpy.divmod(numpy.arange(n_rows * n_columns, dtype=numpy.uint64), n_columns)
+        self.cell_bits = columns * numpy.uint64(n_rows + 1) + numpy.uint64(n_rows - 1) - rows
+        self.center_points = numpy.where(
+            (columns >= 3) & (columns <= n_columns - 4),
+            constants.CONNECT_4_CENTER_COLUMN_POINTS,
+            0
+        ).astype(numpy.int32)
+
+    def best_moves(self, board: Connect4Board, player_number: int) -> list[tuple[int, int]]:
+        scores = self.cell_scores([board], [player_number])[0]
+        available_positions = board.available_positions()
+        max_points = max(scores[i, j] for i, j in available_positions)
+
+        return [(i, j) for i, j in available_positions if scores[i, j] == max_points]
+
+    def cell_scores(self, boards: Sequence[Connect4Board], player_numbers: Sequence[int]) -> numpy.ndarray:
+        # same points as Connect4Bot._best_moves, but for every cell of every board at once
+        planes = self.planes(boards)
+        player_indices = numpy.asarray(player_numbers) - 1
+        board_indices = numpy.arange(len(boards))
+        player_planes = planes[board_indices, player_indices]
+        opponent_planes = planes[board_indices, 1 - player_indices]
+
+        player_counts = player_planes @ self.line_cells.T
+        opponent_counts = opponent_planes @ self.line_cells.T
+        line_points = numpy.where(opponent_counts == 0, 1 + player_counts, 0)
+
+        return (line_points @ self.line_cells + self.center_points).reshape(len(boards), self.n_rows, self.n_columns)
+
+    def planes(self, boards: Sequence[Connect4Board]) -> numpy.ndarray:
+        # shape (n_boards, 2, n_cells): 1 where the player of that plane has a piece
+        bitboards = numpy.array([board.bitboards for board in boards], numpy.uint64).reshape(len(boards), 2, 1)
+
+        return ((bitboards >> self.cell_bits) & numpy.uint64(1)).astype(numpy.int32)
@@ -1,11 +1,18 @@
+import functools
 import io
 import math
 import random
+import struct
+import zlib
+from dataclasses import dataclass
 from typing import Sequence
 
 import cairo
+import numpy
 
 from flanabot import constants
+from flanabot.connect_4_engine import Connect4Board
+from flanabot.lru_cache import LRUCache
 from flanabot.models.player import Player
 
 SIZE_MULTIPLIER = 1
@@ -33,17 +40,80 @@ RED = (255 / 255, 70 / 255, 70 / 255)
 PLAYER_1_COLOR = BLUE
 PLAYER_2_COLOR = RED
 
+PALETTE_SIZE = 256
+TEXT_SPRITE_MARGIN = 2
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+render_cache = LRUCache[tuple, bytes](max_size=constants.CONNECT_4_RENDER_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class TextSprite:
+    surface: cairo.ImageSurface
+    origin: tuple[float, float]
+    width: float
+
 
 def center_point(board_position: Sequence[int]) -> tuple[float, float]:
     return LEFT_MARGIN + (board_position[1] + 0.5) * CELL_LENGTH, TOP_MARGIN + (board_position[0] + 0.5) * CELL_LENGTH
 
 
+@functools.cache
+def disc_sprite(color: tuple[float, float, float]) -> cairo.ImageSurface:
+    sprite = cairo.ImageSurface(cairo.FORMAT_ARGB32, CELL_LENGTH, CELL_LENGTH)
+    context = cairo.Context(sprite)
+    context.translate(*(-coordinate for coordinate in top_left_point((0, 0))))
+    draw_circle((0, 0), CIRCLE_RADIUS, color, context)
+
+    return sprite
+
+
 def draw_circle(board_position: Sequence[int], radius: float, color: tuple[float, float, float], context: cairo.Context):
     context.set_source_rgba(*color)
     context.arc(*center_point(board_position), radius, 0, 2 * math.pi)
     context.fill()
 
 
+def draw_image(
+    board: Connect4Board,
+    next_turn_player: Player = None,
+    winner: Player = None,
+    loser: Player = None,
+    highlight=None,
+    win_position: Sequence[int] = None,
+    tie=False
+) -> cairo.ImageSurface:
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, SURFACE_WIDTH, SURFACE_HEIGHT)
+    context = cairo.Context(surface)
+
+    context.set_source_surface(static_layer())
+    context.set_operator(cairo.OPERATOR_SOURCE)
+    context.paint()
+    context.set_operator(cairo.OPERATOR_OVER)
+
+    if highlight:
+        x, y = top_left_point(highlight)
+        paint_sprite(highlight_sprite(HIGHLIGHT_COLOR), (x + TABLE_LINE_WIDTH / 2, y + TABLE_LINE_WIDTH / 2), context)
+    for i in range(constants.CONNECT_4_N_ROWS):
+        for j in range(constants.CONNECT_4_N_COLUMNS):
+            match board[i, j]:
+                case 1:
+                    paint_sprite(disc_sprite(PLAYER_1_COLOR), top_left_point((i, j)), context)
+                case 2:
+                    paint_sprite(disc_sprite(PLAYER_2_COLOR), top_left_point((i, j)), context)
+
+    if tie:
+        write_tie(context)
+    elif winner:
+        player_color = PLAYER_1_COLOR if winner.number == 1 else PLAYER_2_COLOR
+        draw_winner_lines(win_position, board, player_color, context)
+        write_winner(winner, loser, context)
+    else:
+        write_player_turn(next_turn_player.name, PLAYER_1_COLOR if next_turn_player.number == 1 else PLAYER_2_COLOR, context)
+
+    return surface
+
+
 def draw_line(
     board_position_start: Sequence[int],
     board_position_end: Sequence[int],
@@ -88,70 +158,65 @@ def draw_text(
     font_size: float,
     italic: bool,
     context: cairo.Context
-):
-    context.move_to(*point)
-    context.set_source_rgba(*color)
-    context.select_font_face("Sans", cairo.FONT_SLANT_ITALIC if italic else cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
-    context.set_font_size(font_size)
-    context.show_text(text)
+) -> float:
+    sprite = text_sprite(text, color, font_size, italic)
+    # whole pixel positions so the strip is copied as is instead of resampled
+    paint_sprite(sprite.surface, (round(point[0] - sprite.origin[0]), round(point[1] - sprite.origin[1])), context)
+
+    return sprite.width
 
 
 def draw_winner_lines(
     win_position: Sequence[int],
-    board: list[list[int | None]],
+    board: Connect4Board,
     color: tuple[float, float, float],
     context: cairo.Context
 ):
     i, j = win_position
-    player_number = board[i][j]
-
-    # horizontal
-    j_a = j - 1
-    while j_a >= 0 and board[i][j_a] == player_number:
-        j_a -= 1
-    j_b = j + 1
-    while j_b < constants.CONNECT_4_N_COLUMNS and board[i][j_b] == player_number:
-        j_b += 1
-    if abs(j_a - j) + abs(j_b - j) - 1 >= 4:
-        draw_line((i, j_a + 1), (i, j_b - 1), CROSS_LINE_WIDTH, color, context)
-
-    # vertical
-    i_a = i - 1
-    while i_a >= 0 and board[i_a][j] == player_number:
-        i_a -= 1
-    i_b = i + 1
-    while i_b < constants.CONNECT_4_N_ROWS and board[i_b][j] == player_number:
-        i_b += 1
-    if abs(i_a - i) + abs(i_b - i) - 1 >= 4:
-        draw_line((i_a + 1, j), (i_b - 1, j), CROSS_LINE_WIDTH, color, context)
-
-    # diagonal 1
-    i_a = i - 1
-    j_a = j - 1
-    while i_a >= 0 and j_a >= 0 and board[i_a][j_a] == player_number:
-        i_a -= 1
-        j_a -= 1
-    i_b = i + 1
-    j_b = j + 1
-    while i_b < constants.CONNECT_4_N_ROWS and j_b < constants.CONNECT_4_N_COLUMNS and board[i_b][j_b] == player_number:
-        i_b += 1
-        j_b += 1
-    if abs(i_a - i) + abs(i_b - i) - 1 >= 4:
-        draw_line((i_a + 1, j_a + 1), (i_b - 1, j_b - 1), CROSS_LINE_WIDTH, color, context)
-
-    # diagonal 2
-    i_a = i - 1
-    j_a = j + 1
-    while i_a >= 0 and j_a < constants.CONNECT_4_N_COLUMNS and board[i_a][j_a] == player_number:
-        i_a -= 1
-        j_a += 1
-    i_b = i + 1
-    j_b = j - 1
-    while i_b < constants.CONNECT_4_N_ROWS and j_b >= 0 and board[i_b][j_b] == player_number:
-        i_b += 1
-        j_b -= 1
-    if abs(i_a - i) + abs(i_b - i) - 1 >= 4:
-        draw_line((i_a + 1, j_a - 1), (i_b - 1, j_b + 1), CROSS_LINE_WIDTH, color, context)
+    player_bitboard = board.bitboards[board[i, j] - 1]
+
+    for line_index in board.winning_lines.cell_lines[i][j]:
+        if player_bitboard & (line_mask := board.winning_lines.masks[line_index]) == line_mask:
+            line = board.winning_lines.lines[line_index]
+            draw_line(line[0], line[-1], CROSS_LINE_WIDTH, color, context)
+
+
+def encode_palette_png(surface: cairo.ImageSurface) -> bytes:
+    # the board only has a few flat colors plus their antialiasing blends, so an 8-bit palette is enough
+    surface.flush()
+    width = surface.get_width()
+    height = surface.get_height()
+    pixels = numpy.frombuffer(surface.get_data(), numpy.uint32).reshape(height, -1)[:, :width]
+
+    colors, indices, counts = numpy.unique(pixels, return_inverse=True, return_counts=True)
+    indices = indices.reshape(height, width)
+    if len(colors) > PALETTE_SIZE:
+        # keep the most used colors and map the rest (antialiasing pixels) to the nearest one
+        palette_colors = colors[numpy.argsort(counts)[::-1][:PALETTE_SIZE]]
+        distances = (
+            (to_rgb(colors)[:, numpy.newaxis, :].astype(numpy.int32) - to_rgb(palette_colors)[numpy.newaxis, :, :]) ** 2
+        ).sum(axis=2)
+        indices = distances.argmin(axis=1)[indices]
+        colors = palette_colors
+
+    rows = numpy.zeros((height, width + 1), numpy.uint8)
+    rows[:, 1:] = indices
+    compressor = zlib.compressobj(constants.CONNECT_4_PNG_COMPRESSION_LEVEL, memLevel=9)
+
+    return b''.join((
+        PNG_SIGNATURE,
+        png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)),
+        png_chunk(b'PLTE', to_rgb(colors).tobytes()),
+        png_chunk(b'IDAT', compressor.compress(rows.tobytes()) + compressor.flush()),
+        png_chunk(b'IEND', b'')
+    ))
+
+
+def encode_png(surface: cairo.ImageSurface) -> bytes:
+    buffer = io.BytesIO()
+    surface.write_to_png(buffer)
+
+    return buffer.getvalue()
 
 
 def highlight_cell(
@@ -172,8 +237,19 @@ def highlight_cell(
     context.fill()
 
 
+@functools.cache
+def highlight_sprite(color: tuple[float, float, float]) -> cairo.ImageSurface:
+    # only the inside of the cell, the table lines around it are already in the static layer
+    sprite = cairo.ImageSurface(cairo.FORMAT_ARGB32, CELL_LENGTH - TABLE_LINE_WIDTH, CELL_LENGTH - TABLE_LINE_WIDTH)
+    context = cairo.Context(sprite)
+    context.translate(*(-coordinate - TABLE_LINE_WIDTH / 2 for coordinate in top_left_point((0, 0))))
+    highlight_cell((0, 0), color, context)
+
+    return sprite
+
+
 def make_image(
-    board: list[list[int | None]],
+    board: Connect4Board,
     next_turn_player: Player = None,
     winner: Player = None,
     loser: Player = None,
@@ -181,40 +257,93 @@ def make_image(
     win_position: Sequence[int] = None,
     tie=False
 ) -> bytes:
+    key = (
+        board.key(),
+        next_turn_player and (next_turn_player.name, next_turn_player.number),
+        winner and (winner.name, winner.number),
+        loser and (loser.name, loser.number),
+        highlight and tuple(highlight),
+        win_position and tuple(win_position),
+        tie
+    )
+    if (image_bytes := render_cache.get(key)) is None:
+        image_bytes = render_image(board, next_turn_player, winner, loser, highlight, win_position, tie)
+        render_cache.set(key, image_bytes)
+
+    return image_bytes
+
+
+def paint_background(color: tuple[float, float, float], context: cairo.Context):
+    context.set_source_rgba(*color)
+    context.paint()
+
+
+def paint_sprite(sprite: cairo.ImageSurface, point: Sequence[float], context: cairo.Context):
+    context.set_source_surface(sprite, *point)
+    context.rectangle(*point, sprite.get_width(), sprite.get_height())
+    context.fill()
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def render_image(
+    board: Connect4Board,
+    next_turn_player: Player = None,
+    winner: Player = None,
+    loser: Player = None,
+    highlight=None,
+    win_position: Sequence[int] = None,
+    tie=False
+) -> bytes:
+    surface = draw_image(board, next_turn_player, winner, loser, highlight, win_position, tie)
+
+    return encode_palette_png(surface) if constants.CONNECT_4_PALETTE_PNG else encode_png(surface)
+
+
+@functools.cache
+def static_layer() -> cairo.ImageSurface:
     surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, SURFACE_WIDTH, SURFACE_HEIGHT)
     context = cairo.Context(surface)
 
     paint_background(BACKGROUND_COLOR, context)
-    if highlight:
-        highlight_cell(highlight, HIGHLIGHT_COLOR, context)
     draw_table(TABLE_LINE_WIDTH, GRAY, context)
     write_numbers(GRAY, context)
-    for i in range(constants.CONNECT_4_N_ROWS):
-        for j in range(constants.CONNECT_4_N_COLUMNS):
-            match board[i][j]:
-                case 1:
-                    draw_circle((i, j), CIRCLE_RADIUS, PLAYER_1_COLOR, context)
-                case 2:
-                    draw_circle((i, j), CIRCLE_RADIUS, PLAYER_2_COLOR, context)
 
-    if tie:
-        write_tie(context)
-    elif winner:
-        player_color = PLAYER_1_COLOR if winner.number == 1 else PLAYER_2_COLOR
-        draw_winner_lines(win_position, board, player_color, context)
-        write_winner(winner, loser, context)
-    else:
-        write_player_turn(next_turn_player.name, PLAYER_1_COLOR if next_turn_player.number == 1 else PLAYER_2_COLOR, context)
+    return surface
 
-    buffer = io.BytesIO()
-    surface.write_to_png(buffer)
 
-    return buffer.getvalue()
+@functools.lru_cache(maxsize=constants.CONNECT_4_TEXT_CACHE_SIZE)
+def text_sprite(text: str, color: tuple[float, float, float], font_size: float, italic: bool) -> TextSprite:
+    def set_font(context: cairo.Context):
+        context.select_font_face("Sans", cairo.FONT_SLANT_ITALIC if italic else cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
+        context.set_font_size(font_size)
 
+    measure_context = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+    set_font(measure_context)
+    ascent, descent, *_ = measure_context.font_extents()
+    x_bearing, y_bearing, width, height, x_advance, _ = measure_context.text_extents(text)
 
-def paint_background(color: tuple[float, float, float], context: cairo.Context):
+    left = min(0, x_bearing) - TEXT_SPRITE_MARGIN
+    right = max(x_advance, x_bearing + width) + TEXT_SPRITE_MARGIN
+    top = min(-ascent, y_bearing) - TEXT_SPRITE_MARGIN
+    bottom = max(descent, y_bearing + height) + TEXT_SPRITE_MARGIN
+    origin = (math.ceil(-left), math.ceil(-top))
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, origin[0] + math.ceil(right), origin[1] + math.ceil(bottom))
+    context = cairo.Context(surface)
+    set_font(context)
+    context.move_to(*origin)
     context.set_source_rgba(*color)
-    context.paint()
+    context.show_text(text)
+
+    return TextSprite(surface, origin, width)
+
+
+def to_rgb(colors: numpy.ndarray) -> numpy.ndarray:
+    # cairo stores every ARGB32 pixel as a native endian 0xAARRGGBB integer, the board is opaque so alpha is ignored
+    return numpy.stack(((colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF), axis=-1).astype(numpy.uint8)
 
 
 def top_left_point(board_position: Sequence[int]) -> tuple[float, float]:
@@ -229,14 +358,13 @@ def write_numbers(color: tuple[float, float, float], context: cairo.Context):
 
 
 def write_player_turn(name: str, color: tuple[float, float, float], context: cairo.Context):
-    text = 'Turno de '
     point = TEXT_POSITION
-    draw_text(text, point, GRAY, FONT_SIZE, True, context)
+    width = draw_text('Turno de ', point, GRAY, FONT_SIZE, True, context)
 
-    point = (point[0] + context.text_extents(text).width + 9 * SIZE_MULTIPLIER, point[1])
-    draw_text(name, point, color, FONT_SIZE, True, context)
+    point = (point[0] + width + 9 * SIZE_MULTIPLIER, point[1])
+    width = draw_text(name, point, color, FONT_SIZE, True, context)
 
-    point = (point[0] + context.text_extents(name).width, point[1])
+    point = (point[0] + width, point[1])
     draw_text('.', point, GRAY, FONT_SIZE, True, context)
 
 
@@ -248,14 +376,13 @@ def write_winner(winner: Player, loser: Player, context: cairo.Context):
     winner_color, loser_color = (PLAYER_1_COLOR, PLAYER_2_COLOR) if winner.number == 1 else (PLAYER_2_COLOR, PLAYER_1_COLOR)
 
     point = TEXT_POSITION
-    draw_text(winner.name, point, winner_color, FONT_SIZE, True, context)
+    width = draw_text(winner.name, point, winner_color, FONT_SIZE, True, context)
 
-    text = ' le ha ganado a '
-    point = (point[0] + context.text_extents(winner.name).width + 3 * SIZE_MULTIPLIER, point[1])
-    draw_text(text, point, GRAY, FONT_SIZE, True, context)
+    point = (point[0] + width + 3 * SIZE_MULTIPLIER, point[1])
+    width = draw_text(' le ha ganado a ', point, GRAY, FONT_SIZE, True, context)
 
-    point = (point[0] + context.text_extents(text).width + 10 * SIZE_MULTIPLIER, point[1])
-    draw_text(loser.name, point, loser_color, FONT_SIZE, True, context)
+    point = (point[0] + width + 10 * SIZE_MULTIPLIER, point[1])
+    width = draw_text(loser.name, point, loser_color, FONT_SIZE, True, context)
 
-    point = (point[0] + context.text_extents(loser.name).width + 3 * SIZE_MULTIPLIER, point[1])
+    point = (point[0] + width + 3 * SIZE_MULTIPLIER, point[1])
     draw_text('!!!', point, GRAY, FONT_SIZE, True, context)
@@ -0,0 +1,163 @@
+import argparse
+import mmap
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from flanabot import constants
+from flanabot.connect_4_engine import Connect4Board
+from flanabot.connect_4_solver import Connect4Solver, TranspositionTable
+
+# header: magic, rows, columns, ply, 3 padding bytes
+# records: little-endian u64 with the canonical position key in the high 56 bits and the best column in the low 8
+HEADER_FORMAT = '<4sBBB3x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b'C4OB'
+RECORD_FORMAT = '<Q'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+SOLVER_TRANSPOSITION_TABLE_SIZE = 2 ** 18
+
+
+class Connect4OpeningBook:
+    def __init__(self, path: str | Path = constants.CONNECT_4_OPENING_BOOK_PATH):
+        self.path = Path(path)
+        self.n_rows = 0
+        self.n_columns = 0
+        self.ply = 0
+        self._mmap: mmap.mmap | None = None
+        self._n_records = 0
+
+        try:
+            with open(self.path, 'rb') as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return
+
+        magic, self.n_rows, self.n_columns, self.ply = struct.unpack_from(HEADER_FORMAT, self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{self.path} is not a connect 4 opening book')
+
+        self._n_records = (len(self._mmap) - HEADER_SIZE) // RECORD_SIZE
+
+    def __len__(self) -> int:
+        return self._n_records
+
+    def _find(self, key: int) -> int | None:
+        low = 0
+        high = self._n_records - 1
+
+        while low <= high:
+            middle = (low + high) // 2
+            record = struct.unpack_from(RECORD_FORMAT, self._mmap, HEADER_SIZE + middle * RECORD_SIZE)[0]
+            record_key = record >> 8
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle - 1
+            else:
+                return record & 0xFF
+
+    def best_move(self, board: Connect4Board) -> int | None:
+        if (
+            not self._n_records
+            or
+            board.n_moves > self.ply
+            or
+            (board.n_rows, board.n_columns) != (self.n_rows, self.n_columns)
+        ):
+            return
+
+        key = board.key()
+        mirrored_key = board.mirrored_key()
+        if (move := self._find(min(key, mirrored_key))) is None:
+            return
+
+        return move if key <= mirrored_key else board.n_columns - 1 - move
+
+    def close(self):
+        if self._mmap:
+            self._mmap.close()
+            self._mmap = None
+        self._n_records = 0
+
+
+def _canonical_positions(ply: int, n_rows: int, n_columns: int) -> dict[int, tuple[int, ...]]:
+    positions = {}
+    board = Connect4Board(n_rows, n_columns)
+    moves = []
+
+    def add_positions():
+        if (canonical_key := min(board.key(), board.mirrored_key())) in positions:
+            return
+
+        positions[canonical_key] = tuple(moves)
+        if board.n_moves >= ply:
+            return
+
+        player_number = board.n_moves % 2 + 1
+        for j in range(n_columns):
+            if not board.is_playable(j):
+                continue
+
+            i, j = board.insert(j, player_number)
+            if player_number not in board.winners(i, j) and not board.is_full():
+                moves.append(j)
+                add_positions()
+                moves.pop()
+            board.remove(j)
+
+    add_positions()
+
+    return positions
+
+
+def _solve(moves: tuple[int, ...], n_rows: int, n_columns: int, search_depth: int) -> int:
+    board = Connect4Board(n_rows, n_columns)
+    for j in moves:
+        board.insert(j, board.n_moves % 2 + 1)
+
+    solver = Connect4Solver(TranspositionTable(SOLVER_TRANSPOSITION_TABLE_SIZE))
+    move = solver.best_move(board, board.n_moves % 2 + 1, search_depth)
+
+    return move if board.key() <= board.mirrored_key() else n_columns - 1 - move
+
+
+def build(
+    path: str | Path = constants.CONNECT_4_OPENING_BOOK_PATH,
+    ply: int = constants.CONNECT_4_OPENING_BOOK_PLY,
+    search_depth: int = constants.CONNECT_4_OPENING_BOOK_SEARCH_DEPTH,
+    n_rows: int = constants.CONNECT_4_N_ROWS,
+    n_columns: int = constants.CONNECT_4_N_COLUMNS,
+    max_workers: int = None
+) -> int:
+    positions = _canonical_positions(ply, n_rows, n_columns)
+    keys = sorted(positions)
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        moves = executor.map(
+            _solve,
+            (positions[key] for key in keys),
+            (n_rows for _ in keys),
+            (n_columns for _ in keys),
+            (search_depth for _ in keys),
+            chunksize=16
+        )
+        records = b''.join(struct.pack(RECORD_FORMAT, key << 8 | move) for key, move in zip(keys, moves))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(struct.pack(HEADER_FORMAT, MAGIC, n_rows, n_columns, ply) + records)
+
+    return len(keys)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute the connect 4 AI replies for the first plies.')
+    parser.add_argument('--output', type=Path, default=constants.CONNECT_4_OPENING_BOOK_PATH)
+    parser.add_argument('--ply', type=int, default=constants.CONNECT_4_OPENING_BOOK_PLY)
+    parser.add_argument('--depth', type=int, default=constants.CONNECT_4_OPENING_BOOK_SEARCH_DEPTH)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    print(f'{build(args.output, args.ply, args.depth, max_workers=args.workers)} positions written to {args.output}')
@@ -0,0 +1,238 @@
+import functools
+import random
+import time
+from collections.abc import Callable, Sequence
+from enum import IntEnum, auto
+
+from flanabot import constants
+from flanabot.connect_4_engine import Connect4Board
+
+CENTER_POINTS = 3
+NODES_BETWEEN_TIME_CHECKS = 1024
+THREAT_POINTS = 8
+WIN_SCORE = 1_000_000
+
+PLAYER_2_KEY = random.Random(WIN_SCORE).getrandbits(64)
+
+# set in every worker process by init_search_process
+_search_stop_flags: Sequence[int] | None = None
+
+
+class Bound(IntEnum):
+    EXACT = auto()
+    LOWER = auto()
+    UPPER = auto()
+
+
+class SearchTimeoutError(Exception):
+    pass
+
+
+class TranspositionTable:
+    def __init__(self, size: int = constants.CONNECT_4_TRANSPOSITION_TABLE_SIZE):
+        self._size = size
+        self._entries: list[tuple[int, int, Bound, int, int | None] | None] = [None] * size
+
+    def get(self, key: int) -> tuple[int, Bound, int, int | None] | None:
+        if (entry := self._entries[key % self._size]) and entry[0] == key:
+            return entry[1:]
+
+    def put(self, key: int, depth: int, bound: Bound, score: int, move: int | None):
+        index = key % self._size
+
+        # depth-preferred replacement, but always overwrite entries of other positions
+        if (entry := self._entries[index]) and entry[0] == key and entry[1] > depth:
+            return
+
+        self._entries[index] = (key, depth, bound, score, move)
+
+
+class Connect4Solver:
+    def __init__(self, transposition_table: TranspositionTable = None):
+        self.transposition_table = transposition_table if transposition_table is not None else TranspositionTable()
+        self._deadline: float | None = None
+        self._nodes = 0
+        self._stop: Callable[[], bool] | None = None
+
+    def _check_time(self):
+        self._nodes += 1
+        if (
+            not self._nodes % NODES_BETWEEN_TIME_CHECKS
+            and
+            (
+                (self._deadline is not None and time.perf_counter() > self._deadline)
+                or
+                (self._stop is not None and self._stop())
+            )
+        ):
+            raise SearchTimeoutError
+
+    @staticmethod
+    def _evaluate(board: Connect4Board, player_number: int) -> int:
+        next_player_number = 3 - player_number
+        center_mask = board.column_mask(board.n_columns // 2)
+
+        return (
+            THREAT_POINTS * (board.threats(player_number).bit_count() - board.threats(next_player_number).bit_count())
+            +
+            CENTER_POINTS * (
+                (board.bitboards[player_number - 1] & center_mask).bit_count()
+                -
+                (board.bitboards[next_player_number - 1] & center_mask).bit_count()
+            )
+        )
+
+    @staticmethod
+    def _key(board: Connect4Board, player_number: int) -> int:
+        return board.zobrist_key ^ PLAYER_2_KEY if player_number == 2 else board.zobrist_key
+
+    def _negamax(self, board: Connect4Board, player_number: int, depth: int, alpha: int, beta: int) -> int:
+        self._check_time()
+
+        next_player_number = 3 - player_number
+        playable_mask = board.playable_mask()
+
+        if board.threats(player_number) & playable_mask:
+            return WIN_SCORE - board.n_moves - 1
+        if board.is_full():
+            return 0
+
+        next_player_threats = board.threats(next_player_number)
+        forced_moves = next_player_threats & playable_mask
+        if forced_moves & (forced_moves - 1) or next_player_threats & (forced_moves << 1):
+            # two threats the opponent can complete next turn, or one that can only be blocked under another
+            return -(WIN_SCORE - board.n_moves - 2)
+
+        if not depth:
+            return self._evaluate(board, player_number)
+
+        original_alpha = alpha
+        key = self._key(board, player_number)
+        tt_move = None
+        if entry := self.transposition_table.get(key):
+            entry_depth, bound, score, tt_move = entry
+            if entry_depth >= depth:
+                match bound:
+                    case Bound.EXACT:
+                        return score
+                    case Bound.LOWER:
+                        alpha = max(alpha, score)
+                    case Bound.UPPER:
+                        beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for j in self.ordered_moves(board, tt_move, forced_moves):
+            board.insert(j, player_number)
+            try:
+                score = -self._negamax(board, next_player_number, depth - 1, -beta, -alpha)
+            finally:
+                board.remove(j)
+
+            if score > best_score:
+                best_score = score
+                best_move = j
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.transposition_table.put(key, depth, bound, best_score, best_move)
+
+        return best_score
+
+    def best_move(
+        self,
+        board: Connect4Board,
+        player_number: int,
+        max_depth: int,
+        time_budget: float = None,
+        stop: Callable[[], bool] = None
+    ) -> int | None:
+        self._deadline = None if time_budget is None else time.perf_counter() + time_budget
+        self._nodes = 0
+        self._stop = stop
+
+        playable_mask = board.playable_mask()
+        threats = board.threats(player_number) & playable_mask
+        forced_moves = board.threats(3 - player_number) & playable_mask
+        for j in self.ordered_moves(board):
+            if threats & board.column_mask(j):
+                return j
+        for j in self.ordered_moves(board):
+            if forced_moves & board.column_mask(j):
+                return j
+
+        best_move = None
+        try:
+            for depth in range(1, max_depth + 1):
+                best_score = -WIN_SCORE - 1
+                depth_best_move = None
+                alpha = -WIN_SCORE - 1
+                for j in self.ordered_moves(board, best_move):
+                    board.insert(j, player_number)
+                    try:
+                        score = -self._negamax(board, 3 - player_number, depth - 1, -WIN_SCORE - 1, -alpha)
+                    finally:
+                        board.remove(j)
+
+                    if score > best_score:
+                        best_score = score
+                        depth_best_move = j
+                    alpha = max(alpha, score)
+
+                best_move = depth_best_move
+                if abs(best_score) >= WIN_SCORE - board.n_rows * board.n_columns:
+                    break
+        except SearchTimeoutError:
+            pass
+
+        return best_move
+
+    @staticmethod
+    def ordered_moves(board: Connect4Board, first_move: int = None, forced_moves: int = 0) -> list[int]:
+        center = (board.n_columns - 1) / 2
+        moves = sorted(
+            (j for j in range(board.n_columns) if board.is_playable(j)),
+            key=lambda j: (j != first_move, abs(j - center))
+        )
+
+        if forced_moves:
+            moves = [j for j in moves if forced_moves & board.column_mask(j)]
+
+        return moves
+
+
+@functools.cache
+def _process_solver() -> Connect4Solver:
+    return Connect4Solver()
+
+
+def init_search_process(stop_flags: Sequence[int]):
+    global _search_stop_flags
+
+    _search_stop_flags = stop_flags
+
+
+def search_best_move(
+    rows: list[list[int | None]],
+    player_number: int,
+    max_depth: int,
+    time_budget: float = None,
+    stop_slot: int = None
+) -> int | None:
+    # entry point for worker processes, each one keeps its own solver and transposition table between calls. The
+    # search stops early when its slot in the shared stop flags is set
+    if stop_slot is None:
+        stop = None
+    else:
+        stop = functools.partial(_search_stop_flags.__getitem__, stop_slot)
+
+    return _process_solver().best_move(Connect4Board.from_rows(rows), player_number, max_depth, time_budget, stop)
@@ -4,20 +4,43 @@ from pathlib import Path
 
 from multibot import Platform
 
-from models.enums import Exchange, PaymentMethod
+from models.enums import Connect4Difficulty, Exchange, PaymentMethod
 
 AUDIT_LOG_AGE = datetime.timedelta(hours=1)
 AUDIT_LOG_LIMIT = 5
 AUTO_WEATHER_EVERY = datetime.timedelta(hours=6)
+BTC_OFFERS_API_CONNECT_TIMEOUT_SECONDS = 5
+BTC_OFFERS_API_CONNECTIONS_PER_HOST = 10
+BTC_OFFERS_API_DNS_CACHE_SECONDS = datetime.timedelta(minutes=5).total_seconds()
+BTC_OFFERS_API_KEEPALIVE_SECONDS = datetime.timedelta(minutes=1).total_seconds()
+BTC_OFFERS_API_TIMEOUT_SECONDS = 30
+BTC_OFFERS_CACHE_TTL_SECONDS = 30
 BTC_OFFERS_DEFAULT_LIMIT = 5
 BTC_OFFERS_MAX_LIMIT = 10
-BTC_OFFERS_WEBSOCKET_RETRY_DELAY_SECONDS = datetime.timedelta(minutes=5).total_seconds()
+BTC_OFFERS_MESSAGE_MAX_CHARACTERS = {Platform.DISCORD: 2000, Platform.TELEGRAM: 4096}
+BTC_OFFERS_NOTIFICATION_QUEUE_SIZE = 100
+BTC_OFFERS_NOTIFICATION_WORKERS = 8
+BTC_OFFERS_SNAPSHOT_LIMIT = 1000
+BTC_OFFERS_WEBSOCKET_MAX_RETRY_DELAY_SECONDS = datetime.timedelta(minutes=5).total_seconds()
+BTC_OFFERS_WEBSOCKET_MIN_RETRY_DELAY_SECONDS = 0.1
 CHECK_CLIENT_CONNECTIONS_EVERY_SECONDS = datetime.timedelta(minutes=1).total_seconds()
 CHECK_PUNISHMENTS_EVERY_SECONDS = datetime.timedelta(hours=1).total_seconds()
 CONNECT_4_AI_DELAY_SECONDS = 1
 CONNECT_4_CENTER_COLUMN_POINTS = 2
 CONNECT_4_N_COLUMNS = 7
 CONNECT_4_N_ROWS = 6
+CONNECT_4_OPENING_BOOK_PATH = Path('resources/connect_4_opening_book.bin')
+CONNECT_4_OPENING_BOOK_PLY = 4
+CONNECT_4_OPENING_BOOK_SEARCH_DEPTH = 12
+CONNECT_4_PALETTE_PNG = True
+CONNECT_4_PNG_COMPRESSION_LEVEL = 9
+CONNECT_4_RENDER_CACHE_SIZE = 256
+CONNECT_4_RENDER_WORKERS = 2
+CONNECT_4_SEARCH_DEPTHS = {Connect4Difficulty.MEDIUM: 4, Connect4Difficulty.HARD: 14}
+CONNECT_4_SEARCH_STOP_SLOTS = 64
+CONNECT_4_SEARCH_WORKERS = 2
+CONNECT_4_TEXT_CACHE_SIZE = 64
+CONNECT_4_TRANSPOSITION_TABLE_SIZE = 2 ** 20
 FLANASERVER_API_BASE_URL = 'https://flanaserver.duckdns.org/api'
 FLANASERVER_FILE_EXPIRATION_SECONDS = datetime.timedelta(days=3).total_seconds()
 FLOOD_2s_LIMIT = 2
@@ -153,8 +176,11 @@ KEYWORDS = {
     'choose': ('choose', 'elige', 'escoge'),
     'connect_4': (('conecta', 'connect', 'ralla', 'raya'), ('4', 'cuatro', 'four')),
     'dice': ('dado', 'dice'),
+    'easy': ('easy', 'facil', 'principiante', 'sencillo'),
     'eur': ('eur', 'euro', 'euros', '€'),
     'force': ('force', 'forzar', 'fuerza'),
+    'hard': ('complicado', 'dificil', 'difficult', 'experto', 'hard'),
+    'medium': ('intermedio', 'medio', 'medium', 'normal'),
     'money': ('bitcoin', 'btc', 'cripto', 'criptomoneda', 'crypto', 'cryptocurrency', 'currency', 'currency', 'dinero',
               'divisa', 'moneda', 'money', 'precio', 'price', 'satoshi'),
     'multiple_answer': ('multi', 'multi-answer', 'multiple', 'multirespuesta'),
@@ -0,0 +1,82 @@
+import functools
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+
+import flanautils
+
+# jaro-winkler = jaro + prefix * 0.1 * (1 - jaro), with a prefix of at most 4 characters
+_MAX_WINKLER_BOOST = 0.4
+_MATCHES_CACHE_SIZE = 4096
+
+
+class KeywordIndex[T]:
+    def __init__(self, keywords: Mapping[T, Iterable[str]], min_score: float, exclusive: bool = True):
+        self.min_score = min_score
+        self.exclusive = exclusive
+        self.values = list(keywords)
+
+        # jaro <= (2 + shorter_length / longer_length) / 3, so a pair of strings too different in length can't score
+        min_jaro = (min_score - _MAX_WINKLER_BOOST) / (1 - _MAX_WINKLER_BOOST)
+        self._min_length_ratio = 3 * min_jaro - 2
+
+        # the order of the values is their priority, and longer keywords are checked before shorter ones
+        self._exact_hits: dict[str, set[int]] = defaultdict(set)
+        self._keywords_by_length: list[dict[int, dict[int, list[str]]]] = []
+        self._word_counts: list[list[int]] = []
+        for value_keywords in keywords.values():
+            keywords_by_length = defaultdict(lambda: defaultdict(list))
+            for keyword in value_keywords:
+                n_words = len(keyword.split())
+                self._exact_hits[keyword].add(len(self._keywords_by_length))
+                keywords_by_length[n_words][len(keyword)].append(keyword)
+
+            self._keywords_by_length.append(keywords_by_length)
+            self._word_counts.append(sorted(keywords_by_length, reverse=True))
+
+        self._exact_hits = dict(self._exact_hits)
+        # per index, so the indices don't evict each other's entries
+        self._matches = functools.lru_cache(maxsize=_MATCHES_CACHE_SIZE)(self._matches_uncached)
+
+    def _matches_uncached(self, value_index: int, n_words: int, ngram: str) -> bool:
+        if value_index in self._exact_hits.get(ngram, ()):
+            return True
+
+        ngram_length = len(ngram)
+        for keyword_length, keywords in self._keywords_by_length[value_index][n_words].items():
+            if min(keyword_length, ngram_length) < self._min_length_ratio * max(keyword_length, ngram_length):
+                continue
+
+            if flanautils.cartesian_product_string_matching(keywords, (ngram,), min_score=self.min_score):
+                return True
+
+        return False
+
+    def find(self, text: str) -> list[T]:
+        found_values = []
+
+        # values are matched by priority and, in exclusive mode, the text of each match is removed, so the words
+        # around it become adjacent for the values checked later
+        for value_index, word_counts in enumerate(self._word_counts):
+            for n_words in word_counts:
+                words = text.split()
+                start = 0
+                while start + n_words <= len(words):
+                    ngram = ' '.join(words[start:start + n_words])
+                    if not self._matches(value_index, n_words, ngram):
+                        start += 1
+                        continue
+
+                    if self.values[value_index] not in found_values:
+                        found_values.append(self.values[value_index])
+
+                    if not self.exclusive:
+                        break
+
+                    if (new_text := text.replace(ngram, '')) != text:
+                        text = new_text
+                        words = text.split()
+                        start = 0
+                    else:
+                        start += 1
+
+        return found_values
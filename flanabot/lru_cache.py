@@ -1,3 +1,4 @@
+import threading
 from collections import OrderedDict
 from collections.abc import Generator, Iterable
 
@@ -35,3 +36,55 @@ class FIFOCache[T]:
 
     def discard(self, item: T) -> None:
         self._cache.pop(item, None)
+
+
+class LRUCache[K, V]:
+    def __init__(self, max_size: int | None = None):
+        self._max_size = max_size
+        self._cache = OrderedDict[K, V]()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(size={len(self._cache)}, max_size={self._max_size}, hits={self.hits}, misses={self.misses})'
+
+    @property
+    def hit_rate(self) -> float:
+        if not (lookups := self.hits + self.misses):
+            return 0
+
+        return self.hits / lookups
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._cache.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+
+            if self._max_size is not None and len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
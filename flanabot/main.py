@@ -12,10 +12,18 @@ async def main():
     flana_disc_bot = FlanaDiscBot()
     flana_tele_bot = FlanaTeleBot()
 
-    await asyncio.gather(
-        flana_disc_bot.start(),
-        flana_tele_bot.start()
-    )
+    try:
+        await asyncio.gather(
+            flana_disc_bot.start(),
+            flana_tele_bot.start()
+        )
+    finally:
+        await asyncio.gather(
+            flana_disc_bot.close_btc_offers_session(),
+            flana_disc_bot.close_connect_4_executors(),
+            flana_tele_bot.close_btc_offers_session(),
+            flana_tele_bot.close_connect_4_executors()
+        )
 
 
 if __name__ == '__main__':
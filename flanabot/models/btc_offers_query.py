@@ -0,0 +1,20 @@
+__all__ = ['BtcOffersQuery']
+
+from dataclasses import dataclass, field
+
+from flanabot.models.enums import BtcOffersMode, Exchange, PaymentMethod
+
+
+@dataclass
+class BtcOffersQuery:
+    modes: set[BtcOffersMode] = field(default_factory=set)
+    number: int | float = 0
+    payment_methods: list[PaymentMethod] = field(default_factory=list)
+    exchanges: list[Exchange] = field(default_factory=list)
+
+    @property
+    def mode(self) -> BtcOffersMode | None:
+        if len(self.modes) == 1:
+            return next(iter(self.modes))
+
+        return None
@@ -21,6 +21,7 @@ class Chat(MultiBotChat):
             'auto_insult': True,
             'auto_scraping': True,
             'auto_weather_chart': False,
+            'btc_offers_collapsed': False,
             'check_flood': False,
             'check_spam': False,
             'client_connection_notifications': True,
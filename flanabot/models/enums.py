@@ -1,4 +1,4 @@
-__all__ = ['Action', 'ButtonsGroup', 'Exchange', 'PaymentMethod']
+__all__ = ['Action', 'BtcOffersMode', 'ButtonsGroup', 'Connect4Difficulty', 'Exchange', 'PaymentMethod']
 
 from enum import auto
 
@@ -10,6 +10,12 @@ class Action(FlanaEnum):
     MESSAGE_DELETED = auto()
 
 
+class BtcOffersMode(FlanaEnum):
+    EUR = auto()
+    USD = auto()
+    PREMIUM = auto()
+
+
 class ButtonsGroup(FlanaEnum):
     CONFIG = auto()
     CONNECT_4 = auto()
@@ -19,6 +25,12 @@ class ButtonsGroup(FlanaEnum):
     WEATHER = auto()
 
 
+class Connect4Difficulty(FlanaEnum):
+    EASY = auto()
+    MEDIUM = auto()
+    HARD = auto()
+
+
 class Exchange(FlanaEnum):
     HODLHODL = 'HodlHodl'
     LNP2PBOT = 'lnp2pBot'
@@ -0,0 +1,21 @@
+__all__ = ['ScrapingText']
+
+from dataclasses import dataclass, field
+
+from flanautils import OrderedSet
+
+
+@dataclass
+class ScrapingText:
+    tiktok_users_and_ids: OrderedSet[str] = field(default_factory=OrderedSet)
+    tiktok_download_urls: OrderedSet[str] = field(default_factory=OrderedSet)
+    urls: list[str] = field(default_factory=list)
+    gif_urls: set[str] = field(default_factory=set)
+    user_words: list[str] = field(default_factory=list)
+
+    @property
+    def has_ids(self) -> bool:
+        return bool(self.tiktok_users_and_ids or self.tiktok_download_urls)
+
+    def media_urls(self, force=False) -> list[str]:
+        return [url for url in self.urls if force or url not in self.gif_urls]
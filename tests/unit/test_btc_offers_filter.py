@@ -0,0 +1,78 @@
+import unittest
+
+from flanabot.btc_offers_filter import BtcOffersFilter
+
+
+class TestBtcOffersFilter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.offers = [
+            {
+                'exchange': 'hodlhodl',
+                'id': '1',
+                'payment_methods': ['bizum', 'sepa'],
+                'price_eur': 50000,
+                'price_usd': 54000,
+                'premium': 1,
+                'author': 'alice',
+                'description': 'Solo Bizum'
+            },
+            {
+                'exchange': 'robosats',
+                'id': '2',
+                'payment_methods': ['paypal'],
+                'price_eur': 60000,
+                'price_usd': 64800,
+                'premium': 5,
+                'author': 'bob',
+                'description': None
+            },
+            {
+                'exchange': 'robosats',
+                'id': '3',
+                'payment_methods': ['sepa'],
+                'price_eur': 55000,
+                'price_usd': 59400,
+                'premium': 3,
+                'author': 'carol',
+                'description': 'No KYC, pago rapido'
+            }
+        ]
+
+    def _filter_ids(self, query: dict) -> list[str]:
+        return [offer['id'] for offer in BtcOffersFilter.from_query(query).apply(self.offers)]
+
+    def test_limit(self):
+        self.assertEqual(['1', '2', '3'], self._filter_ids({}))
+        self.assertEqual(['1', '2'], self._filter_ids({'limit': 2}))
+        self.assertEqual([], self._filter_ids({'limit': 0}))
+
+    def test_predicates(self):
+        for query, ids in (
+            ({'exchanges': ['robosats']}, ['2', '3']),
+            ({'payment_methods': ['sepa', 'paypal']}, ['1', '2', '3']),
+            ({'payment_methods': ['bizum']}, ['1']),
+            ({'max_price_eur': 55000}, ['1', '3']),
+            ({'max_price_usd': 54000}, ['1']),
+            ({'max_premium': 3}, ['1', '3']),
+            ({'exchanges': ['robosats'], 'max_premium': 3, 'limit': 5}, ['3'])
+        ):
+            with self.subTest(query):
+                self.assertEqual(ids, self._filter_ids(query))
+
+    def test_ignored(self):
+        for query, ids in (
+            ({'ignore_ids': ['2']}, ['1', '3']),
+            ({'ignore_authors': ['alice', 'carol']}, ['2']),
+            ({'ignore_descriptions': ['kyc']}, ['1', '2']),
+            ({'ignore_descriptions': ['bizum', 'PAGO', '.*']}, ['2']),
+            ({'ignore_descriptions': ['bizum'], 'limit': 1}, ['2'])
+        ):
+            with self.subTest(query):
+                self.assertEqual(ids, self._filter_ids(query))
+
+    def test_order(self):
+        self.offers.reverse()
+
+        self.assertEqual(['3', '2', '1'], self._filter_ids({}))
+        self.assertEqual(['3', '1'], self._filter_ids({'payment_methods': ['sepa']}))
+
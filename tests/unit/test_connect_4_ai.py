@@ -0,0 +1,132 @@
+import os
+
+import flanautils
+
+os.environ |= flanautils.find_environment_variables('../.env')
+
+import random
+import unittest
+
+from flanabot.bots.flana_tele_bot import FlanaTeleBot
+from flanabot import connect_4_engine
+from flanabot.connect_4_engine import Connect4Board
+from flanabot.connect_4_evaluator import Connect4Evaluator
+
+
+class TestConnect4Ai(unittest.TestCase):
+    # games recorded with the line occupancy move scoring (seed: columns played)
+    SELF_PLAY_GAMES = {
+        0: '4444445355553267623325766676212233',
+        1: '44444465555675676521211111222266333',
+        2: '444444535555326762332576667621777223311',
+        3: '4444446555567567652112222211116677333',
+        4: '44444423333213212367677777666622555',
+        5: '444444326555522226726755661313',
+        6: '44444465555675676521122222111166333',
+        8: '44444423333213212367766666777722555',
+        13: '444444326552225525511161117276677776633',
+        14: '4444446555567567652121111122226677333'
+    }
+    VS_RANDOM_PLAYER_GAMES = {
+        0: '7444744417336357563553',
+        1: '24547575771233',
+        2: '7474131512',
+        3: '24545525325244645617',
+        4: '24341363444221',
+        5: '55346435736474',
+        6: '74547515447733131122',
+        7: '3324446413117155153653',
+        8: '243444242264161622317333',
+        9: '445334332526'
+    }
+
+    def _play(self, seed: int, vs_random_player: bool) -> str:
+        random.seed(seed)
+        random_player = random.Random(seed)
+        board = Connect4Board()
+        moves = []
+        current_player_num = 1
+        next_player_num = 2
+
+        while not board.is_full():
+            if vs_random_player and current_player_num == 1:
+                j = random_player.choice([j for _, j in self.flana_tele_bot._available_positions(board)])
+                i, j = self.flana_tele_bot.insert_piece(j, current_player_num, board)
+            else:
+                i, j = self.flana_tele_bot._ai_insert(current_player_num, next_player_num, board)
+
+            moves.append(str(j + 1))
+            if board[i, j] in self.flana_tele_bot._check_winners(i, j, board):
+                break
+
+            current_player_num, next_player_num = next_player_num, current_player_num
+
+        return ''.join(moves)
+
+    def setUp(self) -> None:
+        self.flana_tele_bot = FlanaTeleBot()
+
+    def test_ai_insert_does_not_modify_other_cells(self):
+        board = Connect4Board()
+        for j in (3, 3, 2, 4, 4, 2):
+            board.insert(j, board.n_moves % 2 + 1)
+        rows = board.to_rows()
+
+        i, j = self.flana_tele_bot._ai_insert(1, 2, board)
+
+        rows[i][j] = 1
+        self.assertEqual(rows, board.to_rows())
+
+    def test_recorded_self_play_games(self):
+        for seed, moves in self.SELF_PLAY_GAMES.items():
+            with self.subTest(seed=seed):
+                self.assertEqual(moves, self._play(seed, vs_random_player=False))
+
+    def test_recorded_vs_random_player_games(self):
+        for seed, moves in self.VS_RANDOM_PLAYER_GAMES.items():
+            with self.subTest(seed=seed):
+                self.assertEqual(moves, self._play(seed, vs_random_player=True))
+
+    def test_winning_lines(self):
+        winning_lines = connect_4_engine.winning_lines(6, 7)
+
+        self.assertEqual(69, len(winning_lines.lines))
+        for i, row in enumerate(winning_lines.cell_lines):
+            for j, line_indices in enumerate(row):
+                for line_index in line_indices:
+                    self.assertIn((i, j), winning_lines.lines[line_index])
+
+    def test_incremental_threats(self):
+        random_ = random.Random(0)
+        for _ in range(200):
+            board = Connect4Board()
+            for _ in range(60):
+                if random_.random() < 0.7 and (available_positions := board.available_positions()):
+                    board.insert(random_.choice(available_positions)[1], random_.choice((1, 2)))
+                else:
+                    board.remove(random_.randrange(board.n_columns))
+
+                for player_number in (1, 2):
+                    self.assertEqual(board._bitboard_threats(board.bitboards[player_number - 1]), board.threats(player_number))
+
+    def test_numpy_evaluator_matches_best_moves(self):
+        evaluator = Connect4Evaluator()
+        random_ = random.Random(0)
+        boards = []
+        player_numbers = []
+        for _ in range(200):
+            board = Connect4Board()
+            for _ in range(random_.randrange(30)):
+                board.insert(random_.choice([j for _, j in board.available_positions()]), board.n_moves % 2 + 1)
+            boards.append(board)
+            player_numbers.append(random_.choice((1, 2)))
+
+        cell_scores = evaluator.cell_scores(boards, player_numbers)
+
+        for board, player_number, scores in zip(boards, player_numbers, cell_scores):
+            best_moves = self.flana_tele_bot._best_moves(board.available_positions(), player_number, board)
+            self.assertEqual(best_moves, evaluator.best_moves(board, player_number))
+            self.assertEqual(
+                scores[best_moves[0]],
+                max(scores[position] for position in board.available_positions())
+            )
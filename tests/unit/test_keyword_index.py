@@ -0,0 +1,43 @@
+import unittest
+
+from multibot import constants as multibot_constants
+
+from flanabot import constants
+from flanabot.keyword_index import KeywordIndex
+from flanabot.models import Exchange, PaymentMethod
+
+
+class TestKeywordIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.exchanges_index = KeywordIndex(
+            constants.KEYWORDS['btc_offers_exchanges'],
+            multibot_constants.PARSER_MIN_SCORE_DEFAULT,
+            exclusive=False
+        )
+        self.payment_methods_index = KeywordIndex(
+            constants.KEYWORDS['btc_offers_payment_methods'],
+            multibot_constants.PARSER_MIN_SCORE_DEFAULT
+        )
+
+    def test_exchanges(self):
+        for text, exchanges in (
+            ('ofertas de btc', []),
+            ('ofertas en robosats', [Exchange.ROBOSATS]),
+            ('ofertas en robosat y lnp2pbot', [Exchange.LNP2PBOT, Exchange.ROBOSATS]),
+            ('hodlhodl, robosats o hodlhodl', [Exchange.HODLHODL, Exchange.ROBOSATS])
+        ):
+            with self.subTest(text):
+                self.assertEqual(exchanges, self.exchanges_index.find(text))
+
+    def test_payment_methods(self):
+        for text, payment_methods in (
+            ('ofertas de btc por 100 euros', []),
+            ('ofertas por bizum', [PaymentMethod.BIZUM]),
+            ('ofertas por bizzum o paypall', [PaymentMethod.BIZUM, PaymentMethod.PAYPAL]),
+            ('sepa instantanea', [PaymentMethod.INSTANT_SEPA]),
+            ('sepa instantanea o sepa', [PaymentMethod.INSTANT_SEPA, PaymentMethod.SEPA]),
+            ('con tarjeta o sin tarjeta', [PaymentMethod.CARDLESS_CASH, PaymentMethod.CREDIT_CARD]),
+            ('sepa cajero instantaneas', [PaymentMethod.CARDLESS_CASH, PaymentMethod.INSTANT_SEPA, PaymentMethod.SEPA])
+        ):
+            with self.subTest(text):
+                self.assertEqual(payment_methods, self.payment_methods_index.find(text))